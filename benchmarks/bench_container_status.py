@@ -0,0 +1,56 @@
+"""
+Latency of `/container/status/<name>` under concurrent polling: asking the engine on every
+request (`?fresh=1`, what the endpoint always did before) vs the event-fed containers cache.
+
+Needs the Duckietown base libraries (`dt_class_utils`, `dt_module_utils`), like the jobs.
+"""
+import os
+import argparse
+
+from common import throughput, report
+from fake_engine import FakeEngine
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--containers', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='seconds the fake engine takes to answer')
+    parsed = parser.parse_args()
+
+    with FakeEngine(containers=parsed.containers, latency=parsed.latency) as engine:
+        # the endpoint of the engine is read when the package is imported
+        os.environ['TARGET_ENDPOINT'] = engine.base_url
+        from flask import Flask
+        from code_api.jobs.container_monitor import ContainerMonitorJob
+        from code_api.actions.container.status import status
+
+        monitor = ContainerMonitorJob()
+        monitor.step()
+        app = Flask(__name__)
+        app.register_blueprint(status)
+
+        def _poll(url: str):
+            def _get():
+                response = app.test_client().get(url)
+                assert response.json['data']['status'] == 'RUNNING', response.json
+            return _get
+
+        name = engine.containers[parsed.containers // 2]['Name']
+        report(f'GET /container/status/<name>, {parsed.threads} threads, {parsed.seconds}s, '
+               f'{parsed.latency * 1000:.0f}ms engine latency', {
+                   'engine (before)': throughput(
+                       _poll(f'/container/status/{name}?fresh=1'), parsed.threads,
+                       parsed.seconds),
+                   'cache (after)': throughput(
+                       _poll(f'/container/status/{name}'), parsed.threads, parsed.seconds),
+                   'cache, ID prefix (after)': throughput(
+                       _poll(f"/container/status/{engine.containers[1]['Id'][:12]}"),
+                       parsed.threads, parsed.seconds),
+               })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Requests per second of `/container/status/<name>` and `/container/list` (with `?fresh=1`, i.e.,
+asking the engine) when every call opens a new Docker client (what `get_client()` did before,
+each one negotiating the API version on a fresh connection) vs the shared client, also while
+every health check hangs (callers must not wait for it).
+
+Needs the Duckietown base libraries (`dt_class_utils`, `dt_module_utils`), like the jobs.
+"""
+import os
+import argparse
+
+from common import throughput, report
+from fake_engine import FakeEngine
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--containers', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.001,
+                        help='seconds the fake engine takes to answer')
+    parsed = parser.parse_args()
+
+    with FakeEngine(containers=parsed.containers, latency=parsed.latency) as engine:
+        # the endpoint of the engine is read when the package is imported
+        os.environ['TARGET_ENDPOINT'] = engine.base_url
+        import docker
+        from flask import Flask
+        from code_api import docker_client
+        from code_api.docker_client import DockerClientManager
+        from code_api.actions.container import status as status_module, list as list_module
+
+        app = Flask(__name__)
+        app.register_blueprint(status_module.status)
+        app.register_blueprint(list_module.container_list)
+        endpoints = {
+            'status': f"/container/status/{engine.containers[0]['Name']}?fresh=1",
+            'list': '/container/list?fresh=1',
+        }
+
+        def _get(url: str):
+            def _call():
+                response = app.test_client().get(url)
+                assert response.json['status'] == 'ok', response.json
+            return _call
+
+        def _use(get_client):
+            for module in [status_module, list_module]:
+                module.get_client = get_client
+
+        def _run(label: str, results: dict):
+            for endpoint, url in endpoints.items():
+                results[f'{endpoint}, {label}'] = \
+                    throughput(_get(url), parsed.threads, parsed.seconds)
+
+        results = {}
+        # before: a new client (and connection) per call, never closed
+        _use(lambda: docker.DockerClient(base_url=engine.base_url))
+        _run('before', results)
+        # after: the shared client
+        _use(lambda: docker_client.DockerClients.get())
+        _run('after', results)
+        # a health check is due on every call, and each one takes 2 seconds
+        engine.ping_latency = 2.0
+        docker_client.DockerClients = DockerClientManager(
+            base_url=engine.base_url, pool_size=parsed.threads, healthcheck_sec=0)
+        _run('after, hung ping', results)
+        report(f'GET /container/..., {parsed.threads} threads, {parsed.seconds}s, '
+               f'{parsed.containers} containers', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Load test of the HTTP servers while dashboards keep event streams open: requests per second
+and latency of `/version` with `--streams` clients connected to `/modules/events`.
+
+- werkzeug: the threaded development server (one thread per connection, what we had before)
+- waitress, no cap: a fixed pool of HTTP_THREADS workers, streams take them all
+- waitress, now: HTTP_THREADS + HTTP_MAX_STREAMS workers, streams beyond the cap get a 503
+
+Needs the Duckietown base libraries (`dt_class_utils`, `dt_module_utils`), like the jobs.
+"""
+import os
+import time
+import socket
+import logging
+import argparse
+import threading
+from types import SimpleNamespace
+
+import requests
+from flask import Flask
+from werkzeug.serving import make_server
+
+from common import throughput, report
+
+# closed streams are noticed (and their slots released) at the next keep-alive
+os.environ['STREAM_HEARTBEAT_SEC'] = '1'
+
+from code_api.streams import Streams
+from code_api.knowledge_base import KnowledgeBase
+from code_api.constants import HTTP_THREADS, HTTP_MAX_STREAMS, ModuleStatus
+from code_api.actions.version import version
+from code_api.actions.modules.events import events
+
+
+def _app() -> Flask:
+    app = Flask(__name__)
+    app.register_blueprint(version)
+    app.register_blueprint(events)
+    return app
+
+
+def _serve_waitress(threads: int) -> int:
+    from waitress import create_server
+    server = create_server(_app(), host='127.0.0.1', port=0, threads=threads,
+                           connection_limit=1000)
+    threading.Thread(target=server.run, daemon=True).start()
+    return server.effective_port
+
+
+def _serve_werkzeug() -> int:
+    server = make_server('127.0.0.1', 0, _app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_port
+
+
+def _open_streams(port: int, count: int) -> dict:
+    # raw sockets, so that the streams stay open without reading threads
+    out = {'open': 0, 'refused': 0, 'queued': 0, 'sockets': []}
+    for _ in range(count):
+        s = socket.create_connection(('127.0.0.1', port))
+        s.settimeout(2)
+        s.sendall(b'GET /modules/events HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        try:
+            status = s.recv(64).split(b' ')[1]
+        except socket.timeout:
+            # not even the headers: no worker thread picked up the request
+            status = None
+        out['queued' if status is None else 'open' if status == b'200' else 'refused'] += 1
+        out['sockets'].append(s)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8, help='REST clients')
+    parser.add_argument('--seconds', type=float, default=5)
+    parsed = parser.parse_args()
+    for logger in ['werkzeug', 'waitress']:
+        logging.getLogger(logger).setLevel(logging.ERROR)
+    # streams start with the status of the modules, so that they answer right away
+    KnowledgeBase.set('modules', 'dt-core', SimpleNamespace(
+        status=ModuleStatus.UPDATED, step=None, progress=None))
+
+    scenarios = {
+        'werkzeug': (_serve_werkzeug, 10 ** 6),
+        'waitress, no cap': (lambda: _serve_waitress(HTTP_THREADS), 10 ** 6),
+        'waitress, now': (lambda: _serve_waitress(HTTP_THREADS + HTTP_MAX_STREAMS),
+                          HTTP_MAX_STREAMS),
+    }
+    results = {}
+    for name, (serve, limit) in scenarios.items():
+        Streams.limit = limit
+        port = serve()
+        streams = _open_streams(port, parsed.streams)
+        session = threading.local()
+
+        def _get():
+            if not hasattr(session, 'value'):
+                session.value = requests.Session()
+            session.value.get(f'http://127.0.0.1:{port}/version', timeout=2).raise_for_status()
+
+        result = throughput(_get, parsed.threads, parsed.seconds)
+        results[name] = {'streams_open': streams['open'], 'refused': streams['refused'],
+                         'queued': streams['queued'], **result}
+        for s in streams['sockets']:
+            s.close()
+        while Streams.active > 0:
+            time.sleep(0.1)
+    report(f'GET /version, {parsed.threads} clients, {parsed.seconds}s, '
+           f'{parsed.streams} clients on /modules/events', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+KnowledgeBase micro-benchmark, at different group sizes: writes, single-key reads, iterations
+over a group, and a mix (10 writes every iteration, like the 'containers' group fed by events
+while `/container/list` is polled). Compares the current KB with the flat dict of the original
+code and with copying the whole group on every write.
+"""
+import timeit
+import argparse
+from typing import Any
+
+import common  # noqa: F401
+
+from code_api.knowledge_base import _KnowledgeBase
+
+
+class FlatKnowledgeBase(dict):
+    # the original KB: one dict, groups are key prefixes
+    def get(self, group: str, key: str = None, default: Any = None):
+        if key is not None:
+            return self[f'/{group}/{key}'] if f'/{group}/{key}' in self else default
+        return self.group(group)
+
+    def group(self, group: str):
+        prefix = f'/{group}/'
+        for key in list(self.keys()):
+            if key.startswith(prefix):
+                yield key[len(prefix):], self[key]
+
+    def set(self, group: str, key: str, value: Any):
+        self[f'/{group}/{key}'] = value
+
+
+class EagerCopyKnowledgeBase(object):
+    # copy of the whole group on every write
+    def __init__(self):
+        self._groups = {}
+
+    def get(self, group: str, key: str = None, default: Any = None):
+        if key is not None:
+            return self._groups.get(group, {}).get(key, default)
+        return self.group(group)
+
+    def group(self, group: str):
+        yield from self._groups.get(group, {}).items()
+
+    def set(self, group: str, key: str, value: Any):
+        values = dict(self._groups.get(group, {}))
+        values[key] = value
+        self._groups[group] = values
+
+
+def _measure(kb, size: int, number: int) -> dict:
+    keys = [f'key-{i}' for i in range(size)]
+    for key in keys:
+        kb.set('containers', key, object())
+    # other groups make the flat KB slower to iterate, as in the real process
+    for i in range(200):
+        kb.set('modules', f'module-{i}', object())
+    values = [object() for _ in range(16)]
+    state = {'i': 0}
+
+    def _write():
+        state['i'] += 1
+        kb.set('containers', keys[state['i'] % size], values[state['i'] % 16])
+
+    def _read():
+        kb.get('containers', keys[state['i'] % size])
+
+    def _iterate():
+        for _ in kb.get('containers'):
+            pass
+
+    def _mixed():
+        for _ in range(10):
+            _write()
+        _iterate()
+
+    def _us(function, n):
+        return 1e6 * min(timeit.repeat(function, number=n, repeat=3)) / n
+
+    return {
+        'write_us': _us(_write, number),
+        'read_us': _us(_read, number),
+        'iterate_us': _us(_iterate, max(1, number // 100)),
+        'mixed_us': _us(_mixed, max(1, number // 100)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--number', type=int, default=2000)
+    parsed = parser.parse_args()
+    print(f"{'size':>6} {'implementation':<18} {'write':>10} {'read':>10} {'iterate':>10} "
+          f"{'mixed':>10}   (microseconds per operation)")
+    for size in parsed.sizes:
+        for name, kb in [('flat (original)', FlatKnowledgeBase()),
+                         ('copy every write', EagerCopyKnowledgeBase()),
+                         ('lazy copy (now)', _KnowledgeBase())]:
+            r = _measure(kb, size, parsed.number)
+            print(f"{size:>6} {name:<18} {r['write_us']:>10.2f} {r['read_us']:>10.2f} "
+                  f"{r['iterate_us']:>10.1f} {r['mixed_us']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
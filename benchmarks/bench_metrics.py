@@ -0,0 +1,133 @@
+"""
+Overhead of the metrics on the requests they measure:
+
+- REST API: `/version` served by waitress with and without the timing hooks of `CodeAPI`
+- Docker engine: requests to the fake engine with and without the response hook of the
+  shared client
+
+Rounds alternate between the two variants and the best round of each is kept. On small
+machines the rounds still differ by more than the overhead itself, so the cost of the
+instrumentation alone (no I/O) is measured too and compared with the median latency of a
+request (`hook_pct_of_p50`), that is the figure to read.
+"""
+import time
+import logging
+import argparse
+import threading
+
+import docker
+import requests
+from flask import Flask
+
+from common import throughput, report
+from fake_engine import FakeEngine
+
+from code_api.api import _start_timer, _record_status, _observe_request
+from code_api.docker_client import _observe_response
+from code_api.actions.version import version
+
+
+def _app(instrumented: bool) -> Flask:
+    app = Flask(__name__)
+    app.register_blueprint(version)
+    if instrumented:
+        # same hooks as `CodeAPI`
+        app.before_request(_start_timer)
+        app.after_request(_record_status)
+        app.teardown_request(_observe_request)
+    return app
+
+
+def _serve(app: Flask) -> int:
+    from waitress import create_server
+    server = create_server(app, host='127.0.0.1', port=0, threads=4)
+    threading.Thread(target=server.run, daemon=True).start()
+    return server.effective_port
+
+
+def _rest_client(port: int):
+    session = threading.local()
+
+    def _get():
+        if not hasattr(session, 'value'):
+            session.value = requests.Session()
+        session.value.get(f'http://127.0.0.1:{port}/version', timeout=2).raise_for_status()
+
+    return _get
+
+
+def _docker_client(base_url: str, instrumented: bool):
+    client = docker.DockerClient(base_url=base_url, version='1.41')
+    if instrumented:
+        client.api.hooks['response'].append(_observe_response)
+    return client.api.containers
+
+
+def _per_call_us(function, calls: int = 20000) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return 1e6 * (time.perf_counter() - start) / calls
+
+
+def _best(functions: dict, threads: int, seconds: float, rounds: int) -> dict:
+    best = {}
+    for _ in range(rounds):
+        for name, function in functions.items():
+            result = throughput(function, threads, seconds)
+            if name not in best or result['per_sec'] > best[name]['per_sec']:
+                best[name] = result
+    return best
+
+
+def _overhead(results: dict, cost_us: float) -> dict:
+    bare, instrumented = results['bare'], results['instrumented']
+    return {
+        'throughput_loss_pct': 100 * (1 - instrumented['per_sec'] / bare['per_sec']),
+        'hook_us': cost_us,
+        'hook_pct_of_p50': 100 * cost_us / (1000 * bare['p50_ms']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--rounds', type=int, default=5)
+    parsed = parser.parse_args()
+    logging.getLogger('waitress').setLevel(logging.ERROR)
+
+    # REST API
+    rest = _best({
+        'bare': _rest_client(_serve(_app(False))),
+        'instrumented': _rest_client(_serve(_app(True))),
+    }, parsed.threads, parsed.seconds, parsed.rounds)
+    app = _app(True)
+    response = app.response_class()
+
+    def _hooks():
+        _start_timer()
+        _record_status(response)
+        _observe_request(None)
+
+    with app.test_request_context('/version') as context:
+        context.request.url_rule, _ = context.url_adapter.match(return_rule=True)
+        rest_cost = _per_call_us(_hooks)
+    report(f'GET /version, {parsed.threads} clients, best of {parsed.rounds} x '
+           f'{parsed.seconds}s', {**rest, 'overhead': _overhead(rest, rest_cost)})
+
+    # Docker engine
+    with FakeEngine(containers=20) as engine:
+        docker_results = _best({
+            'bare': _docker_client(engine.base_url, False),
+            'instrumented': _docker_client(engine.base_url, True),
+        }, parsed.threads, parsed.seconds, parsed.rounds)
+        probe = requests.get(f"http://{engine.base_url[len('tcp://'):]}/v1.41/containers/json")
+        docker_cost = _per_call_us(lambda: _observe_response(probe))
+    report(f'GET /containers/json (fake engine), {parsed.threads} threads, best of '
+           f'{parsed.rounds} x {parsed.seconds}s',
+           {**docker_results, 'overhead': _overhead(docker_results, docker_cost)})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Remote inspection of the modules against a local fake registry that takes a fixed time to
+answer: one module after the other (what `UpdateCheckerJob` did before) vs `RemoteInspector`.
+Then, a registry slower than the deadline is inspected on every step, requests must not pile up.
+
+The modules are real `DTModule`s and the requests go through `Registry` (tokens, HEAD for the
+digest, manifest and configuration) over real sockets. The disk cache is off, so that every
+inspection reaches the registry.
+
+Needs the Duckietown base libraries (`dt_class_utils`, `dt_module_utils`), like the jobs.
+"""
+import os
+import time
+import logging
+import argparse
+
+import common  # noqa: F401
+from fake_registry import FakeRegistry
+
+# no disk cache, every inspection goes to the registry
+os.environ['REGISTRY_CACHE_DIR'] = '/dev/null/registry-cache'
+logging.getLogger('CodeAPI:RegistryCache').setLevel(logging.ERROR)
+
+from docker.models.images import Image
+
+from code_api.constants import DOCKER_HUB_API_URL
+from code_api.knowledge_base import DTModule
+from code_api.jobs.update_checker import RemoteInspector
+
+
+def _modules(prefix: str, count: int, registries: int) -> dict:
+    modules = {}
+    for i in range(count):
+        # the local image is not the remote one, so its labels are fetched too
+        image = Image(attrs={'Id': f'sha256:{i:064x}', 'RepoDigests': [],
+                             'Config': {'Labels': {}}})
+        repository = f'registry-{i % registries}.local/duckietown/{prefix}-{i}'
+        modules[f'{prefix}-{i}'] = DTModule(image, f'{repository}:daffy-amd64')
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modules', type=int, default=40)
+    parser.add_argument('--registries', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='seconds the fake registry takes to answer')
+    parsed = parser.parse_args()
+
+    with FakeRegistry(latency=parsed.latency) as registry:
+        # the registry client reads the URLs from here
+        DOCKER_HUB_API_URL.update(registry.urls)
+        print(f'{parsed.modules} modules on {parsed.registries} registries, '
+              f'{parsed.latency}s per request')
+
+        # before: one module after the other (fresh names, so that no token is cached)
+        modules = _modules('sequential', parsed.modules, parsed.registries)
+        inspector = RemoteInspector(workers=1, per_registry=1, deadline=600)
+        start = time.perf_counter()
+        inspected = inspector.inspect(modules)
+        print(f'  sequential (before)          {time.perf_counter() - start:.2f}s, '
+              f'{sum(v is not None for v in inspected.values())} inspected, '
+              f'{sum(registry.requests.values())} requests')
+
+        # after: in parallel, capped per registry
+        registry.reset()
+        modules = _modules('parallel', parsed.modules, parsed.registries)
+        inspector = RemoteInspector(deadline=60)
+        start = time.perf_counter()
+        inspected = inspector.inspect(modules)
+        print(f'  RemoteInspector (after)      {time.perf_counter() - start:.2f}s, '
+              f'{sum(v is not None for v in inspected.values())} inspected, '
+              f'{sum(registry.requests.values())} requests, at most '
+              f'{max(registry.max_running.values())} at a time on a registry')
+
+        # a registry slower than the deadline, inspected again at every step
+        steps, deadline = 5, 0.2
+        registry.reset()
+        registry.latency = 1.0
+        slow = _modules('slow', 8, 1)
+        inspector = RemoteInspector(deadline=deadline)
+        for _ in range(steps):
+            inspector.inspect(slow)
+        in_flight = len(inspector.in_flight)
+        while inspector.in_flight:
+            time.sleep(0.1)
+        times = registry.requests['blob'] / len(slow)
+        print(f'  slow registry, {steps} steps     {sum(registry.requests.values())} requests '
+              f'for {len(slow)} modules, each one inspected {times:.0f} time(s) instead of '
+              f'{steps}, {in_flight} still in flight after the last step')
+
+
+if __name__ == '__main__':
+    main()
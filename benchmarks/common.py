@@ -0,0 +1,58 @@
+"""
+Helpers shared by the benchmarks. Run them from the root of the repository, e.g.,
+
+    python benchmarks/bench_docker_client.py
+"""
+import os
+import sys
+import time
+import statistics
+import threading
+from typing import Callable, List
+
+# the code lives in `packages/`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'packages'))
+
+
+def throughput(function: Callable, threads: int, seconds: float) -> dict:
+    """Calls `function` in a loop from `threads` threads for `seconds` seconds."""
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    errors = [0] * threads
+    stop = threading.Event()
+
+    def _loop(i: int):
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                function()
+            except Exception:
+                errors[i] += 1
+                continue
+            latencies[i].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=_loop, args=(i,), daemon=True) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    samples = sorted(x for xs in latencies for x in xs)
+    return {
+        'calls': len(samples),
+        'errors': sum(errors),
+        'per_sec': len(samples) / elapsed,
+        'p50_ms': 1000 * statistics.median(samples) if samples else None,
+        'p99_ms': 1000 * samples[int(0.99 * (len(samples) - 1))] if samples else None,
+    }
+
+
+def report(title: str, results: dict):
+    print(title)
+    for name, result in results.items():
+        line = ', '.join(f'{k}={v:.2f}' if isinstance(v, float) else f'{k}={v}'
+                         for k, v in result.items())
+        print(f'  {name:<28} {line}')
@@ -0,0 +1,113 @@
+"""
+A minimal stand-in for the Docker engine API, served over TCP, for the benchmarks. It answers
+the few endpoints the benchmarks use and can add a fixed latency to every answer.
+"""
+import re
+import json
+import hashlib
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_VERSION = '1.41'
+
+
+class FakeEngine(object):
+
+    def __init__(self, containers: int = 20, latency: float = 0.0, ping_latency: float = 0.0):
+        self.latency = latency
+        # e.g., an engine that hangs on health checks
+        self.ping_latency = ping_latency
+        self.requests = 0
+        self.containers = [_container(i) for i in range(containers)]
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'tcp://127.0.0.1:{self._server.server_address[1]}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def answer(self, method: str, path: str):
+        path = re.sub(r'^/v[0-9.]+', '', path.split('?')[0])
+        if path == '/_ping':
+            time.sleep(self.ping_latency)
+            return 'OK'
+        if path == '/version':
+            return {'ApiVersion': API_VERSION, 'MinAPIVersion': '1.12', 'Version': '24.0.0'}
+        if path == '/containers/json':
+            return [{'Id': c['Id'], 'Names': [f"/{c['Name']}"], 'Image': c['Config']['Image'],
+                     'State': c['State']['Status'], 'Labels': c['Config']['Labels']}
+                    for c in self.containers]
+        match = re.match(r'^/containers/([^/]+)/json$', path)
+        if match:
+            for c in self.containers:
+                if match.group(1) in [c['Id'], c['Name']]:
+                    return c
+            return None
+        match = re.match(r'^/containers/([^/]+)/(start|stop|restart|kill)$', path)
+        if match and method == 'POST':
+            return ''
+        return None
+
+
+def _container(i: int) -> dict:
+    return {
+        'Id': hashlib.sha256(f'container-{i}'.encode()).hexdigest(),
+        'Name': f'container-{i}',
+        'Image': 'sha256:' + '0' * 64,
+        'Config': {'Image': 'duckietown/dt-core:daffy', 'Labels': {}},
+        'State': {'Status': 'running', 'Running': True}
+    }
+
+
+def _handler(engine: FakeEngine):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self._answer('GET')
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0) or 0)
+            if length:
+                self.rfile.read(length)
+            self._answer('POST')
+
+        def do_HEAD(self):
+            self._answer('HEAD')
+
+        def _answer(self, method: str):
+            engine.requests += 1
+            if engine.latency > 0:
+                time.sleep(engine.latency)
+            out = engine.answer(method, self.path)
+            if out is None:
+                body, status, mime = b'{"message": "not found"}', 404, 'application/json'
+            elif isinstance(out, str):
+                body, status, mime = out.encode(), 200 if out else 204, 'text/plain'
+            else:
+                body, status, mime = json.dumps(out).encode(), 200, 'application/json'
+            self.send_response(status)
+            self.send_header('Content-Type', mime)
+            self.send_header('Api-Version', API_VERSION)
+            if status != 204:
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if status != 204 and method != 'HEAD':
+                self.wfile.write(body)
+
+        def log_message(self, *_):
+            pass
+
+    return Handler
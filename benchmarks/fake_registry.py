@@ -0,0 +1,139 @@
+"""
+A minimal stand-in for the DockerHub registry (and its token service), served over HTTP, for
+the benchmarks. Every image has the same manifest and configuration, every answer can take a
+fixed time. Images are grouped by registry host (the first part of their name, e.g.,
+`registry-0.local/duckietown/dt-core`) to see how many requests each registry gets at once.
+"""
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MANIFEST_V2 = 'application/vnd.docker.distribution.manifest.v2+json'
+
+
+class FakeRegistry(object):
+
+    def __init__(self, latency: float = 0.0, labels: dict = None):
+        self.latency = latency
+        self.config = json.dumps({'config': {'Labels': labels or {}}}).encode()
+        self.config_digest = _digest(self.config)
+        self.manifest = json.dumps({
+            'schemaVersion': 2,
+            'mediaType': MANIFEST_V2,
+            'config': {'mediaType': 'application/vnd.docker.container.image.v1+json',
+                       'size': len(self.config), 'digest': self.config_digest},
+            'layers': [{'mediaType': 'application/vnd.docker.image.rootfs.diff.tar.gzip',
+                        'size': 1000000, 'digest': _digest(str(i).encode())} for i in range(3)]
+        }).encode()
+        self.manifest_digest = _digest(self.manifest)
+        # requests by kind, and requests running at the same time (at most) by registry
+        self.requests = defaultdict(int)
+        self.max_running = defaultdict(int)
+        self._running = defaultdict(int)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    @property
+    def urls(self) -> dict:
+        # same keys and placeholders as `code_api.constants.DOCKER_HUB_API_URL`
+        return {
+            'token': f'{self.base_url}/token?scope=repository:{{image}}:pull&service=fake',
+            'digest': f'{self.base_url}/v2/{{image}}/manifests/{{tag}}',
+            'inspect': f'{self.base_url}/v2/{{image}}/blobs/{{digest}}'
+        }
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.max_running.clear()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def enter(self, kind: str, registry: str):
+        with self._lock:
+            self.requests[kind] += 1
+            self._running[registry] += 1
+            self.max_running[registry] = max(self.max_running[registry],
+                                             self._running[registry])
+
+    def leave(self, registry: str):
+        with self._lock:
+            self._running[registry] -= 1
+
+    def answer(self, path: str):
+        # (kind, registry, body, headers)
+        match = re.match(r'^/token\?scope=repository:([^/]+)/[^:]+:pull', path)
+        if match:
+            body = json.dumps({'token': 'fake-token', 'expires_in': 300}).encode()
+            return 'token', match.group(1), body, {}
+        match = re.match(r'^/v2/([^/]+)/.+/manifests/[^/]+$', path)
+        if match:
+            return 'manifest', match.group(1), self.manifest, {
+                'Content-Type': MANIFEST_V2, 'Docker-Content-Digest': self.manifest_digest,
+                'RateLimit-Limit': '100;w=21600', 'RateLimit-Remaining': '99;w=21600'
+            }
+        match = re.match(r'^/v2/([^/]+)/.+/blobs/(sha256:[0-9a-f]+)$', path)
+        if match and match.group(2) == self.config_digest:
+            return 'blob', match.group(1), self.config, {}
+        return None, None, None, None
+
+
+def _digest(data: bytes) -> str:
+    return 'sha256:' + hashlib.sha256(data).hexdigest()
+
+
+def _handler(registry: FakeRegistry):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self._answer('GET')
+
+        def do_HEAD(self):
+            self._answer('HEAD')
+
+        def _answer(self, method: str):
+            kind, host, body, headers = registry.answer(self.path)
+            if kind is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            kind = f'{kind}_head' if method == 'HEAD' else kind
+            registry.enter(kind, host)
+            try:
+                if registry.latency > 0:
+                    time.sleep(registry.latency)
+            finally:
+                registry.leave(host)
+            self.send_response(200)
+            self.send_header('Content-Type', headers.pop('Content-Type', 'application/json'))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if method != 'HEAD':
+                self.wfile.write(body)
+
+        def log_message(self, *_):
+            pass
+
+    return Handler
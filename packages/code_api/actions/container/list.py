@@ -2,8 +2,9 @@ from typing import List
 
 import docker.errors
 from docker.models.containers import Container
-from flask import Blueprint
+from flask import Blueprint, request
 
+from code_api.jobs import get_job
 from code_api.utils import response_ok, get_client, response_error
 
 
@@ -13,6 +14,12 @@ __all__ = ['list']
 
 @container_list.route('/container/list')
 def _list():
+    fresh = request.args.get('fresh', '0').lower() in ['1', 'yes', 'true']
+    # answer from the containers monitor (if it is in sync)
+    monitor = get_job('ContainerMonitorJob')
+    if not fresh and monitor is not None and monitor.synced:
+        list_container_names = ['/' + c['name'] for c in monitor.list(status='running')]
+        return response_ok({'containers': list_container_names, 'age': monitor.age()})
     # get docker client
     client = get_client()
     # get list of docker container names
@@ -20,7 +27,6 @@ def _list():
         list_container: List[Container] = client.containers.list()
         list_container_names = [c.attrs['Name'] for c in list_container]
         # return status
-        return response_ok({'containers': list_container_names})
+        return response_ok({'containers': list_container_names, 'age': 0})
     except (docker.errors.APIError, KeyError) as e:
         return response_error(f"Error: {str(e)}")
-        
@@ -1,21 +1,55 @@
 import docker.errors
 from docker.models.containers import Container
-from flask import Blueprint
+from flask import Blueprint, Response, request, stream_with_context
 
-from code_api.utils import response_ok, get_client, response_error
+from code_api.constants import STREAM_HEARTBEAT_SEC, LOGS_HUB_RING_LINES
+from code_api.logs import LogReader, format_line, keep_alive
+from code_api.log_hub import LogHubs
+from code_api.streams import Streams
+from code_api.utils import response_ok, get_client, response_error, response_busy
 
 logs = Blueprint('container_logs', __name__)
 __all__ = ['logs']
 
+TRUE = ['1', 'yes', 'true']
+STREAM_FORMATS = {
+    'text': 'text/plain',
+    'sse': 'text/event-stream'
+}
+
 
 @logs.route('/container/logs/<string:container_name>')
 def _logs(container_name):
+    # get arguments
+    try:
+        options = _logs_options()
+    except ValueError as e:
+        return response_error(f"Error: {str(e)}")
+    stream = request.args.get('stream', '0').lower() in TRUE or options['follow']
+    fmt = request.args.get('format', 'text').lower()
+    if stream and fmt not in STREAM_FORMATS:
+        return response_error(f"Error: format '{fmt}' not supported. "
+                              f"Valid choices are {', '.join(STREAM_FORMATS)}")
+    # with `heartbeat=1`, text streams get an empty line every STREAM_HEARTBEAT_SEC seconds of
+    # silence, so that a closed connection is noticed (and its stream slot freed) before the
+    # container logs again; `sse` streams always get a (comment) heartbeat
+    heartbeat = request.args.get('heartbeat', '0').lower() in TRUE
     # get docker client
     client = get_client()
     # get container logs
     try:
         container: Container = client.containers.get(container_name)
-        container_logs_raw: bytes = container.logs()
+        if stream:
+            # the stream holds a worker thread of the server for its whole life
+            if not Streams.acquire():
+                return response_busy('Too many open streams, try again later.')
+            try:
+                return _stream_logs(_open_stream(container, options), fmt, heartbeat)
+            except BaseException:
+                Streams.release()
+                raise
+        del options['follow']
+        container_logs_raw: bytes = container.logs(**options)
     except docker.errors.NotFound:
         return response_error(f"Error: container '{container_name}' not found.")
     except (docker.errors.APIError, KeyError) as e:
@@ -27,3 +61,58 @@ def _logs(container_name):
         return response_error(f"Error occurred while decoding the container's logs: {str(e)}")
     # return logs
     return response_ok({'logs': container_logs})
+
+
+def _logs_options() -> dict:
+    tail = request.args.get('tail', 'all')
+    options = {
+        'follow': request.args.get('follow', '0').lower() in TRUE,
+        'timestamps': request.args.get('timestamps', '0').lower() in TRUE,
+        'tail': tail if tail == 'all' else int(tail)
+    }
+    # `since` and `until` are UNIX timestamps (in seconds)
+    for key in ['since', 'until']:
+        if key in request.args:
+            options[key] = float(request.args[key])
+    return options
+
+
+def _can_share(options: dict) -> bool:
+    # only plain `follow` streams that fit in the shared ring buffer can be shared
+    return options['follow'] and not options['timestamps'] and \
+        'since' not in options and 'until' not in options and \
+        options['tail'] != 'all' and options['tail'] <= LOGS_HUB_RING_LINES
+
+
+def _open_stream(container: Container, options: dict):
+    if _can_share(options):
+        # viewers following the same container share a single engine stream
+        return LogHubs.subscribe(container, options['tail'])
+    reader = LogReader(container.logs(stream=True, **options))
+    reader.start()
+    return reader
+
+
+def _stream_logs(reader, fmt: str, heartbeat: bool = False) -> Response:
+    alive = keep_alive(fmt, text=heartbeat)
+
+    def _generate():
+        try:
+            for line in reader.lines(heartbeat_sec=STREAM_HEARTBEAT_SEC):
+                if line is None:
+                    # the client might be gone, find out before the container logs again
+                    if alive is not None:
+                        yield alive
+                    continue
+                yield format_line(line, fmt)
+        finally:
+            # the client is gone (or the container stopped logging), release the engine stream
+            reader.close()
+
+    response = Response(stream_with_context(_generate()), mimetype=STREAM_FORMATS[fmt], headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # the server closes the response even when the stream never started
+    response.call_on_close(Streams.release)
+    return response
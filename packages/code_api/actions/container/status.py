@@ -1,6 +1,7 @@
 import docker.errors
-from flask import Blueprint
+from flask import Blueprint, request
 
+from code_api.jobs import get_job
 from code_api.constants import ContainerStatus
 from code_api.utils import response_ok, get_client
 
@@ -11,6 +12,18 @@ __all__ = ['status']
 
 @status.route('/container/status/<string:container_name>')
 def _status(container_name):
+    fresh = request.args.get('fresh', '0').lower() in ['1', 'yes', 'true']
+    # answer from the containers monitor (if it is in sync)
+    monitor = get_job('ContainerMonitorJob')
+    if not fresh and monitor is not None and monitor.synced:
+        try:
+            container = monitor.get(container_name)
+            container_status = ContainerStatus.NOTFOUND if container is None else \
+                ContainerStatus.from_string(container['status'])
+        except (LookupError, KeyError):
+            # ambiguous ID prefix (the engine answers with an error too) or unknown status
+            container_status = ContainerStatus.UNKNOWN
+        return response_ok({'status': str(container_status.name), 'age': monitor.age()})
     # get docker client
     client = get_client()
     # get container status
@@ -22,4 +35,4 @@ def _status(container_name):
     except (docker.errors.APIError, KeyError):
         container_status = ContainerStatus.UNKNOWN
     # return status
-    return response_ok({'status': str(container_status.name)})
+    return response_ok({'status': str(container_status.name), 'age': 0})
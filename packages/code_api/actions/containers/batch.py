@@ -0,0 +1,88 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List
+
+import docker.errors
+from flask import Blueprint, request
+
+from code_api.utils import get_client, response_ok, response_error
+from code_api.constants import CONTAINERS_BATCH_PARALLEL, CONTAINERS_BATCH_TIMEOUT_SEC
+from code_api.actions.container.generic import SUPPORTED_ACTIONS
+
+batch = Blueprint('containers_batch', __name__)
+__all__ = ['batch']
+
+
+@batch.route('/containers/<string:action>', methods=['GET', 'POST'])
+def _batch(action):
+    # validate action
+    if action not in SUPPORTED_ACTIONS:
+        return response_error(f"The action '{action}' is not supported.")
+    # get arguments (from the query string and/or a JSON body)
+    try:
+        body = json.loads(request.data) if request.data else {}
+    except ValueError:
+        return response_error('The request body is not valid JSON.')
+    if not isinstance(body, dict):
+        return response_error('The request body must be a JSON object.')
+    try:
+        names = _as_list(body.get('names', [])) + \
+            [n for arg in request.args.getlist('names') for n in arg.split(',') if n]
+        labels = _as_list(body.get('labels', [])) + request.args.getlist('label')
+    except ValueError:
+        return response_error("Arguments 'names' and 'labels' must be strings, lists of "
+                              "strings or maps.")
+    parallel_default, timeout_default = CONTAINERS_BATCH_PARALLEL, CONTAINERS_BATCH_TIMEOUT_SEC
+    try:
+        parallel = int(body.get('parallel', request.args.get('parallel', parallel_default)))
+        timeout = float(body.get('timeout', request.args.get('timeout', timeout_default)))
+    except (TypeError, ValueError):
+        return response_error("Arguments 'parallel' and 'timeout' must be numbers.")
+    parallel = min(max(1, parallel), CONTAINERS_BATCH_PARALLEL)
+    timeout = min(max(0.0, timeout), CONTAINERS_BATCH_TIMEOUT_SEC)
+    # get docker client
+    client = get_client()
+    # label selectors (e.g., `org.duckietown.label.container.owner=code-api`) become names
+    if labels:
+        try:
+            for container in client.api.containers(all=True, filters={'label': labels}):
+                names.append((container.get('Names', None) or ['/'])[0].lstrip('/'))
+        except docker.errors.APIError as e:
+            return response_error(f"Error: {str(e)}")
+    names = list(dict.fromkeys(names))
+    if len(names) <= 0:
+        return response_error("No containers selected, use 'names' and/or 'label'.")
+    # act on all the containers at once (one request each, no need to inspect them first)
+    handler = getattr(client.api, action)
+    results = {}
+    pool = ThreadPoolExecutor(min(parallel, len(names)), thread_name_prefix='ContainersBatch')
+    try:
+        futures = {pool.submit(handler, name): name for name in names}
+        done, _ = wait(futures, timeout=timeout)
+        for future, name in futures.items():
+            if future not in done:
+                results[name] = {'status': 'timeout', 'message': None}
+                continue
+            error = future.exception()
+            if error is None:
+                results[name] = {'status': 'ok', 'message': None}
+            elif isinstance(error, docker.errors.NotFound):
+                results[name] = {'status': 'not_found',
+                                 'message': f'Container `{name}` not found'}
+            else:
+                results[name] = {'status': 'error', 'message': str(error)}
+    finally:
+        # whatever timed out keeps going in the background
+        pool.shutdown(wait=False)
+    return response_ok({'action': action, 'results': results})
+
+
+def _as_list(value) -> List[str]:
+    if isinstance(value, dict):
+        # label selectors can also be given as a map
+        return [f'{k}={v}' if v is not None else k for k, v in value.items()]
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return value
+    raise ValueError(f'Expected a string, a list of strings or a map, got {value!r}')
@@ -0,0 +1,95 @@
+import ipaddress
+
+from flask import Blueprint, Response, request
+
+from code_api.utils import response_ok, response_error
+from code_api.profiling import Profiler, Memory
+from code_api.constants import PROFILING_ALLOW, PROFILING_MAX_SEC
+
+# only registered when the API runs with DEBUG
+profiling = Blueprint('debug_profiling', __name__)
+__all__ = ['profiling']
+
+_ALLOWED = [ipaddress.ip_network(a, strict=False) for a in PROFILING_ALLOW]
+_PROFILE_FORMATS = ['collapsed', 'pstats', 'text']
+_MEMORY_KEYS = ['lineno', 'filename', 'traceback']
+
+
+@profiling.before_request
+def _allow():
+    try:
+        client = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        client = None
+    if client is None or not any(client in network for network in _ALLOWED):
+        return response_error(f"Client '{request.remote_addr}' not allowed."), 403
+
+
+@profiling.route('/debug/profile')
+def _profile():
+    # get arguments
+    fmt = request.args.get('format', 'collapsed').lower()
+    if fmt not in _PROFILE_FORMATS:
+        return response_error(f"Invalid format '{fmt}'. Valid choices are "
+                              f"{', '.join(_PROFILE_FORMATS)}")
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval', 0.01))
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return response_error("Arguments 'seconds', 'interval' and 'limit' must be numbers.")
+    seconds = min(max(0.1, seconds), PROFILING_MAX_SEC)
+    interval = min(max(0.001, interval), 1.0)
+    # threads waiting for work are left out, unless asked for
+    idle = request.args.get('idle', '0').lower() in ['1', 'yes', 'true']
+    # sample the stacks of all threads (the one serving this request waits)
+    samples = Profiler.capture(seconds, interval, idle)
+    if samples is None:
+        return response_error('Another profile is being captured, try again later.')
+    headers = {'X-Profile-Samples': str(samples.samples),
+               'X-Profile-Duration': f'{samples.duration:.3f}',
+               'X-Profile-Idle': str(samples.idle)}
+    if fmt == 'pstats':
+        # load with `pstats.Stats('<file>')`, snakeviz, etc.
+        return Response(samples.to_pstats(), mimetype='application/octet-stream', headers={
+            **headers, 'Content-Disposition': 'attachment; filename=code-api.pstats'
+        })
+    text = samples.collapsed() if fmt == 'collapsed' else samples.text(limit=max(1, limit))
+    return Response(text, mimetype='text/plain; charset=utf-8', headers=headers)
+
+
+@profiling.route('/debug/memory/start')
+def _memory_start():
+    try:
+        frames = int(request.args.get('frames', 1))
+    except ValueError:
+        return response_error("Argument 'frames' must be a number.")
+    if not Memory.start(min(max(1, frames), 64)):
+        return response_error('Memory allocations are already being traced.')
+    return response_ok({'tracing': True})
+
+
+@profiling.route('/debug/memory/diff')
+def _memory_diff():
+    # get arguments
+    key = request.args.get('key', 'lineno').lower()
+    if key not in _MEMORY_KEYS:
+        return response_error(f"Invalid key '{key}'. Valid choices are {', '.join(_MEMORY_KEYS)}")
+    try:
+        limit = int(request.args.get('limit', 25))
+    except ValueError:
+        return response_error("Argument 'limit' must be a number.")
+    reset = request.args.get('reset', '0').lower() in ['1', 'yes', 'true']
+    # compare with the allocations at start (or at the last reset)
+    diff = Memory.diff(key, max(1, limit), reset)
+    if diff is None:
+        return response_error("Memory allocations are not being traced, use "
+                              "'/debug/memory/start' first.")
+    return response_ok(diff)
+
+
+@profiling.route('/debug/memory/stop')
+def _memory_stop():
+    if not Memory.stop():
+        return response_error('Memory allocations are not being traced.')
+    return response_ok({'tracing': False})
@@ -0,0 +1,33 @@
+from flask import Blueprint, request
+
+from code_api.jobs import get_job
+from code_api.streams import Streams
+from code_api.utils import response_ok, response_error, response_busy
+from code_api.constants import JOBS_MAX_WAIT_SEC
+
+
+status = Blueprint('job_status', __name__)
+__all__ = ['status']
+
+
+@status.route('/job/<path:job_name>')
+def _status(job_name):
+    # get arguments
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return response_error("Argument 'wait' must be a number of seconds.")
+    # get job
+    job = get_job(job_name)
+    if job is None:
+        return response_error(f"Job '{job_name}' not found.")
+    # long-poll: answer as soon as the job is finished (or when we are tired of waiting)
+    if wait > 0 and not job.state.finished:
+        # waiting holds a worker thread of the server
+        if not Streams.acquire():
+            return response_busy('Too many requests waiting, try again later.')
+        try:
+            job.wait(min(wait, JOBS_MAX_WAIT_SEC))
+        finally:
+            Streams.release()
+    return response_ok(job.info())
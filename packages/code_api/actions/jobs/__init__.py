@@ -0,0 +1 @@
+from .list import jobs_list
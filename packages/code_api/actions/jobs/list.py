@@ -0,0 +1,25 @@
+from flask import Blueprint, request
+
+from code_api.jobs import Jobs
+from code_api.utils import response_ok, response_error
+from code_api.constants import JobState
+
+
+jobs_list = Blueprint('jobs_list', __name__)
+__all__ = ['jobs_list']
+
+
+@jobs_list.route('/jobs')
+def _list():
+    # get arguments
+    state = request.args.get('state', None)
+    if state is not None:
+        try:
+            state = JobState[state.upper()]
+        except KeyError:
+            return response_error("Invalid state '{}'. Valid choices are {}".format(
+                state, ', '.join(s.name.lower() for s in JobState)
+            ))
+    # most recent first
+    jobs = sorted(Jobs.list(state), key=lambda j: j.created, reverse=True)
+    return response_ok({'jobs': [job.info() for job in jobs]})
@@ -0,0 +1,27 @@
+from collections import Counter
+
+from flask import Blueprint, Response
+
+from code_api.jobs import Jobs, Scheduler, PullQueue
+from code_api.metrics import Metrics
+from code_api.streams import Streams
+
+
+metrics = Blueprint('metrics', __name__)
+
+# gauges are computed when the metrics are scraped
+Metrics.gauge('jobs', 'Jobs in the registry.',
+              lambda: Counter(job.state.name.lower() for job in Jobs.list()), ('state',))
+Metrics.gauge('scheduler_pending_calls', 'Callbacks waiting on the timer queue of the scheduler.',
+              lambda: Scheduler.pending)
+Metrics.gauge('http_streams', 'Long-lived responses (streams, long-polls) being served.',
+              lambda: Streams.active)
+Metrics.gauge('pulls', 'Image pulls in the pull queue.',
+              lambda: {state: len(modules) for state, modules in PullQueue.stats().items()},
+              ('state',))
+
+
+@metrics.route('/metrics')
+def _metrics():
+    # Prometheus text format
+    return Response(Metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -1,3 +1,4 @@
 from .info import info
 from .status import status
 from .update import update
+from .events import events
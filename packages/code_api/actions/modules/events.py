@@ -0,0 +1,61 @@
+import json
+
+from flask import Blueprint, Response, request, stream_with_context
+
+from code_api.events import Events
+from code_api.streams import Streams
+from code_api.utils import response_busy
+from code_api.knowledge_base import KnowledgeBase
+from code_api.constants import EVENTS_MIN_PROGRESS_INTERVAL_SEC, STREAM_HEARTBEAT_SEC, \
+    ModuleStatus
+
+
+events = Blueprint('modules_events', __name__)
+__all__ = ['events']
+
+
+@events.route('/modules/events')
+def _events():
+    # get arguments
+    try:
+        min_interval = float(request.args.get('interval', EVENTS_MIN_PROGRESS_INTERVAL_SEC))
+    except ValueError:
+        min_interval = EVENTS_MIN_PROGRESS_INTERVAL_SEC
+    # the stream holds a worker thread of the server for its whole life
+    if not Streams.acquire():
+        return response_busy('Too many open streams, try again later.')
+    # progress ticks are rate-limited, status transitions are delivered right away
+    subscription = Events.subscribe(coalesce={'progress'}, min_interval=max(0.0, min_interval))
+
+    def _generate():
+        try:
+            # start with the current status of all modules
+            for name, module in KnowledgeBase.get('modules'):
+                yield _sse('status', {
+                    'module': name,
+                    'status': module.status.name,
+                    'status_txt': module.step,
+                    **({'progress': module.progress}
+                       if module.status == ModuleStatus.UPDATING else {})
+                })
+            # then follow the changes
+            for event in subscription.events(heartbeat_sec=STREAM_HEARTBEAT_SEC):
+                if event is None:
+                    # writing something is the only way to find out whether the client is gone
+                    yield b': keep-alive\n\n'
+                    continue
+                yield _sse(event['type'], event)
+        finally:
+            subscription.close()
+
+    response = Response(stream_with_context(_generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # the server closes the response even when the stream never started
+    response.call_on_close(Streams.release)
+    return response
+
+
+def _sse(event_type: str, data: dict) -> bytes:
+    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'.encode('utf-8')
@@ -1,10 +1,12 @@
 import traceback
+from typing import List
 
 from flask import Blueprint, request
 
-from code_api.jobs import get_job
+from code_api.jobs import get_job, PullQueue
 from code_api.utils import response_ok
 from code_api.knowledge_base import KnowledgeBase
+from code_api.pull_progress import PullProgress
 from code_api.constants import ModuleStatus
 
 
@@ -14,17 +16,21 @@ __all__ = ['status']
 
 @status.route('/modules/status')
 def _status():
+    job = get_job('UpdateCheckerJob')
     # recheck can be forced
     if request.args.get('force', '0').lower() in ['1', 'yes', 'true']:
-        job = get_job('UpdateCheckerJob')
         if job:
             try:
-                job.step()
+                job.step(force=True)
             except BaseException:
                 traceback.print_exc()
     # return current status
     data = {}
+    pulls = []
     for tag, module in KnowledgeBase.get('modules'):
+        pull = module.pull
+        if pull is not None:
+            pulls.append(pull)
         data[tag] = {
             'status': module.status.name,
             'status_txt': module.step,
@@ -38,6 +44,28 @@ def _status():
                     'closest': module.closest_remote_version
                 }
             },
-            **({'progress': module.progress} if module.status == ModuleStatus.UPDATING else {})
+            **({'progress': module.progress} if module.status == ModuleStatus.UPDATING else {}),
+            **({'pull': pull.summary()} if pull is not None else {}),
+            **({'last_update': module.last_update} if module.last_update else {}),
+            **({'staged': True} if module.staged is not None else {}),
+            **({'checker': job.scheduler.state(tag)} if job else {})
         }
-    return response_ok(data)
+    meta = {
+        **({'checker': job.scheduler.budget()} if job else {}),
+        'pulls': {
+            **PullQueue.stats(),
+            **_aggregate(pulls)
+        }
+    }
+    return response_ok(data, meta=meta)
+
+
+def _aggregate(pulls: List[PullProgress]) -> dict:
+    # pulls run side by side, the slowest one tells when we are done
+    throughput = sum(p.throughput for p in pulls)
+    etas = [p.eta for p in pulls]
+    return {
+        'throughput': round(throughput, 1),
+        'remaining': sum(p.remaining_bytes for p in pulls),
+        'eta': round(max(etas), 1) if etas and None not in etas else None
+    }
@@ -1,13 +1,17 @@
+import time
 import logging
 
-from flask import Flask
+from flask import Flask, Response, g, request
 from flask_cors import CORS
 
+from .metrics import HTTP_REQUESTS, HTTP_LATENCY
 from .actions.version import version as api_version
+from .actions.metrics import metrics as api_metrics
 
 from .actions.modules.info import info as modules_info
 from .actions.modules.status import status as modules_status
 from .actions.modules.update import update as modules_update
+from .actions.modules.events import events as modules_events
 
 from .actions.module.update import update as module_update
 
@@ -17,6 +21,14 @@ from .actions.container.logs import logs as container_logs
 from .actions.container.generic import generic as container_generic
 from .actions.container.list import container_list
 
+from .actions.containers.batch import batch as containers_batch
+
+from .actions.job.status import status as job_status
+
+from .actions.jobs.list import jobs_list
+
+from .actions.debug.profiling import profiling as debug_profiling
+
 
 class CodeAPI(Flask):
 
@@ -24,10 +36,12 @@ class CodeAPI(Flask):
         super(CodeAPI, self).__init__(__name__)
         # register blueprints (/*)
         self.register_blueprint(api_version)
+        self.register_blueprint(api_metrics)
         # register blueprints (/modules/*)
         self.register_blueprint(modules_info)
         self.register_blueprint(modules_status)
         self.register_blueprint(modules_update)
+        self.register_blueprint(modules_events)
         # register blueprints (/module/*)
         self.register_blueprint(module_update)
         # register blueprints (/container/*)
@@ -36,7 +50,43 @@ class CodeAPI(Flask):
         self.register_blueprint(container_list)
         self.register_blueprint(container_logs)
         self.register_blueprint(container_generic)
+        # register blueprints (/containers/*)
+        self.register_blueprint(containers_batch)
+        # register blueprints (/job/*)
+        self.register_blueprint(job_status)
+        # register blueprints (/jobs/*)
+        self.register_blueprint(jobs_list)
+        # register blueprints (/debug/*), only in debug mode and for the allowed clients
+        if debug:
+            self.register_blueprint(debug_profiling)
+        # time every request, teardown also runs for those that failed with an unhandled error
+        self.before_request(_start_timer)
+        self.after_request(_record_status)
+        self.teardown_request(_observe_request)
         # apply CORS settings
         CORS(self)
         # configure logging
         logging.getLogger('werkzeug').setLevel(logging.DEBUG if debug else logging.WARNING)
+        logging.getLogger('waitress').setLevel(logging.DEBUG if debug else logging.WARNING)
+
+
+def _start_timer():
+    g.start_time = time.perf_counter()
+
+
+def _record_status(response: Response) -> Response:
+    g.status_code = response.status_code
+    return response
+
+
+def _observe_request(error: BaseException = None):
+    # every access through the context proxies costs as much as updating a metric, resolve once
+    state = g._get_current_object()
+    start = getattr(state, 'start_time', None)
+    if start is None:
+        return
+    req = request._get_current_object()
+    endpoint = req.url_rule.rule if req.url_rule is not None else 'unknown'
+    status = 500 if error is not None else getattr(state, 'status_code', 500)
+    HTTP_REQUESTS.labels(req.method, endpoint, status).inc()
+    HTTP_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
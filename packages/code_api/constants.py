@@ -5,9 +5,85 @@ API_VERSION = '1.1'
 
 # keep the update interval big enough so that the DockerHub limits are not crossed (12 hours)
 CHECK_UPDATES_EVERY_MIN = max(1, int(os.environ.get('CHECK_UPDATES_EVERY_MIN', 12 * 60)))
+# compare manifest digests first (HEAD requests do not count against the DockerHub pull limits)
+CHECK_UPDATES_BY_DIGEST = os.environ.get('CHECK_UPDATES_BY_DIGEST', 'yes').lower() in \
+    ['1', 'yes', 'true']
+# spread module checks over time (jitter as a fraction of the interval), and back off (up to the
+# given factor) when the DockerHub budget of requests left is smaller than the given minimum
+CHECK_UPDATES_JITTER = min(1.0, max(0.0, float(os.environ.get('CHECK_UPDATES_JITTER', 0.25))))
+CHECK_UPDATES_MIN_BUDGET = max(0, int(os.environ.get('CHECK_UPDATES_MIN_BUDGET', 20)))
+CHECK_UPDATES_MAX_BACKOFF = max(1, int(os.environ.get('CHECK_UPDATES_MAX_BACKOFF', 16)))
+# modules are tracked through the Docker events, a full rescan of the images is only a fallback
+MODULES_RECONCILE_EVERY_MIN = max(1, int(os.environ.get('MODULES_RECONCILE_EVERY_MIN', 60)))
+# containers are also tracked through the Docker events, a full listing is only a fallback
+CONTAINERS_RECONCILE_EVERY_SEC = max(1, int(os.environ.get('CONTAINERS_RECONCILE_EVERY_SEC', 60)))
 RELEASES_ONLY = os.environ.get('RELEASES_ONLY', 'yes').lower() in ['1', 'yes', 'true']
 DT_MODULE_TYPE = os.environ.get('DT_MODULE_TYPE', None)
 
+# background jobs (threads in the pool shared by all jobs)
+JOBS_WORKERS = max(2, int(os.environ.get('JOBS_WORKERS', 8)))
+# finished jobs are kept for a while (seconds, and at most this many), longest long-poll on a job
+JOBS_TTL_SEC = max(0, int(os.environ.get('JOBS_TTL_SEC', 60 * 60)))
+JOBS_HISTORY_SIZE = max(0, int(os.environ.get('JOBS_HISTORY_SIZE', 100)))
+JOBS_MAX_WAIT_SEC = max(0, int(os.environ.get('JOBS_MAX_WAIT_SEC', 60)))
+
+# module updates (images pulled at the same time, modules sharing layers are pulled one at a time)
+UPDATE_PULL_CONCURRENCY = max(1, int(os.environ.get('UPDATE_PULL_CONCURRENCY', 2)))
+# containers of the same module recreated at the same time
+UPDATE_RECREATE_WORKERS = max(1, int(os.environ.get('UPDATE_RECREATE_WORKERS', 4)))
+# download pending updates in the background (when nothing else is being pulled), how often we
+# look for something to download, and how much (compressed) data we are allowed to stage
+PREFETCH_UPDATES = os.environ.get('PREFETCH_UPDATES', 'no').lower() in ['1', 'yes', 'true']
+PREFETCH_EVERY_MIN = max(1, int(os.environ.get('PREFETCH_EVERY_MIN', 10)))
+PREFETCH_DISK_BUDGET_MB = max(0, int(os.environ.get('PREFETCH_DISK_BUDGET_MB', 2048)))
+
+# profiling endpoints (only with DEBUG), clients allowed to use them (addresses or networks,
+# comma-separated), and longest capture
+PROFILING_ALLOW = [
+    a.strip() for a in os.environ.get('PROFILING_ALLOW', '127.0.0.1,::1').split(',') if a.strip()
+]
+PROFILING_MAX_SEC = max(1, int(os.environ.get('PROFILING_MAX_SEC', 60)))
+
+# remote inspection of modules (worker threads, max parallel requests per registry, deadline)
+CHECK_UPDATES_WORKERS = max(1, int(os.environ.get('CHECK_UPDATES_WORKERS', 8)))
+CHECK_UPDATES_PER_REGISTRY = max(1, int(os.environ.get('CHECK_UPDATES_PER_REGISTRY', 4)))
+CHECK_UPDATES_DEADLINE_SEC = max(1, int(os.environ.get('CHECK_UPDATES_DEADLINE_SEC', 60)))
+# modules not inspected within the deadline are retried after this long (doubling every time)
+CHECK_UPDATES_RETRY_SEC = max(1, int(os.environ.get('CHECK_UPDATES_RETRY_SEC', 60)))
+
+# registry client (HTTP connection pool size and per-request timeout)
+REGISTRY_POOL_SIZE = max(1, int(os.environ.get('REGISTRY_POOL_SIZE', 8)))
+REGISTRY_TIMEOUT_SEC = max(1, int(os.environ.get('REGISTRY_TIMEOUT_SEC', 10)))
+
+# persistent cache of manifests and image configurations fetched from the registry
+REGISTRY_CACHE_DIR = os.environ.get('REGISTRY_CACHE_DIR', '/data/cache/code-api/registry')
+REGISTRY_CACHE_MAX_MB = max(1, int(os.environ.get('REGISTRY_CACHE_MAX_MB', 32)))
+
+# last known state of the modules, restored at startup
+MODULES_SNAPSHOT_DIR = os.environ.get('MODULES_SNAPSHOT_DIR', '/data/cache/code-api/modules')
+
+# HTTP server ('waitress' or 'werkzeug'), worker threads, open connections, pending connections,
+# and seconds before idle connections are closed
+HTTP_SERVER = os.environ.get('HTTP_SERVER', 'waitress').lower()
+HTTP_THREADS = max(1, int(os.environ.get('HTTP_THREADS', 16)))
+# long-lived responses (event streams, log follows, long-polls) running at the same time, they get
+# worker threads of their own (on top of HTTP_THREADS), the ones beyond this are refused (503)
+HTTP_MAX_STREAMS = max(1, int(os.environ.get('HTTP_MAX_STREAMS', 8)))
+HTTP_CONNECTION_LIMIT = max(1, int(os.environ.get('HTTP_CONNECTION_LIMIT', 100)))
+HTTP_BACKLOG = max(1, int(os.environ.get('HTTP_BACKLOG', 64)))
+HTTP_CHANNEL_TIMEOUT_SEC = max(1, int(os.environ.get('HTTP_CHANNEL_TIMEOUT_SEC', 120)))
+
+# batch container actions (containers acted upon at the same time, max. seconds per batch)
+CONTAINERS_BATCH_PARALLEL = max(1, int(os.environ.get('CONTAINERS_BATCH_PARALLEL', 8)))
+CONTAINERS_BATCH_TIMEOUT_SEC = max(1, int(os.environ.get('CONTAINERS_BATCH_TIMEOUT_SEC', 60)))
+
+# shared Docker client (connection pool size and seconds between two health checks)
+DOCKER_ENDPOINT = os.environ.get('TARGET_ENDPOINT', 'unix:///var/run/docker.sock')
+DOCKER_CLIENT_POOL_SIZE = max(1, int(os.environ.get('DOCKER_CLIENT_POOL_SIZE', 16)))
+DOCKER_CLIENT_HEALTHCHECK_SEC = max(0, int(os.environ.get('DOCKER_CLIENT_HEALTHCHECK_SEC', 10)))
+# per-call timeout of the asyncio Docker client
+DOCKER_ASYNC_TIMEOUT_SEC = max(1, int(os.environ.get('DOCKER_ASYNC_TIMEOUT_SEC', 10)))
+
 CANONICAL_ARCH = {
     'arm': 'arm32v7',
     'arm32v7': 'arm32v7',
@@ -42,6 +118,20 @@ DOCKER_HUB_API_URL = {
         'https://registry-1.docker.io/v2/{image}/blobs/{digest}'
 }
 
+# keep-alive period of streaming responses
+STREAM_HEARTBEAT_SEC = max(1, int(os.environ.get('STREAM_HEARTBEAT_SEC', 15)))
+
+# container logs streaming (longest line kept in memory, lines buffered)
+LOGS_MAX_LINE_BYTES = max(1024, int(os.environ.get('LOGS_MAX_LINE_BYTES', 64 * 1024)))
+LOGS_BUFFER_LINES = max(1, int(os.environ.get('LOGS_BUFFER_LINES', 1000)))
+# viewers following the same container share one engine stream and a ring buffer of recent lines
+LOGS_HUB_RING_LINES = max(1, int(os.environ.get('LOGS_HUB_RING_LINES', 1000)))
+
+# push channel of module events (events buffered per client, min. time between progress events)
+EVENTS_BUFFER_SIZE = max(1, int(os.environ.get('EVENTS_BUFFER_SIZE', 1000)))
+EVENTS_MIN_PROGRESS_INTERVAL_SEC = \
+    max(0.0, float(os.environ.get('EVENTS_MIN_PROGRESS_INTERVAL_SEC', 0.5)))
+
 STATIC_MODULE_CFG = {
     'auto_remove': False,
     'remove': False,
@@ -60,6 +150,17 @@ class ModuleStatus(IntEnum):
     ERROR = 20
 
 
+class JobState(IntEnum):
+    PENDING = 0
+    RUNNING = 1
+    SUCCEEDED = 2
+    FAILED = 3
+
+    @property
+    def finished(self) -> bool:
+        return self in [JobState.SUCCEEDED, JobState.FAILED]
+
+
 class ContainerStatus(IntEnum):
     NOTFOUND = -1
     UNKNOWN = 0
@@ -0,0 +1,186 @@
+import json
+import time
+import asyncio
+from threading import Thread, Lock
+from typing import Any, Awaitable, List, Tuple
+from urllib.parse import urlencode, urlparse, quote
+
+import docker.errors
+from docker.models.containers import Container as DockerContainer
+
+from .constants import DOCKER_ENDPOINT, DOCKER_CLIENT_POOL_SIZE, DOCKER_ASYNC_TIMEOUT_SEC
+from .docker_client import DockerClients
+from .metrics import DOCKER_REQUESTS, DOCKER_LATENCY, docker_endpoint
+
+
+class AsyncDockerClient(object):
+    """
+    Minimal asyncio client for the (read-only part of the) Docker engine API.
+
+    Requests are HTTP/1.1 over the unix socket (or TCP endpoint) in `TARGET_ENDPOINT`,
+    connections are kept alive and shared through a bounded pool. The client runs its own
+    event loop on a background thread, so that blocking code (blueprints, jobs) can fan out
+    several calls at once with `run_all` and wait for one round-trip instead of N.
+    """
+
+    def __init__(self, base_url: str = DOCKER_ENDPOINT, pool_size: int = DOCKER_CLIENT_POOL_SIZE,
+                 timeout: float = DOCKER_ASYNC_TIMEOUT_SEC):
+        self._base_url = urlparse(base_url)
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._loop = None
+        self._idle = []
+        self._slots = None
+        self._lock = Lock()
+        self._api_version = None
+
+    # --- blocking API
+
+    def run(self, coro: Awaitable, timeout: float = None) -> Any:
+        # the API version is negotiated here, blocking calls have no place in the event loop
+        self._negotiate()
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def run_all(self, coros: List[Awaitable], timeout: float = None) -> List[Any]:
+        # exceptions are returned (in place of the results) rather than raised
+
+        async def _gather():
+            return await asyncio.gather(*coros, return_exceptions=True)
+
+        return self.run(_gather(), timeout)
+
+    def containers(self, filters: dict = None, all: bool = True) -> List[DockerContainer]:
+        # same as `DockerClient.containers.list` but containers are inspected concurrently
+        summaries = self.run(self.list_containers(all=all, filters=filters))
+        results = self.run_all([self.inspect_container(c['Id']) for c in summaries])
+        client = DockerClients.get()
+        containers = []
+        for attrs in results:
+            if isinstance(attrs, docker.errors.NotFound):
+                # the container disappeared in the meantime
+                continue
+            if isinstance(attrs, BaseException):
+                # a partial list would look like a complete one to the caller
+                raise attrs
+            containers.append(client.containers.prepare_model(attrs))
+        return containers
+
+    # --- coroutines
+
+    async def list_containers(self, all: bool = False, filters: dict = None) -> List[dict]:
+        params = {'all': '1' if all else '0'}
+        if filters:
+            params['filters'] = json.dumps({
+                k: (v if isinstance(v, list) else [v]) for k, v in filters.items()
+            })
+        return await self.get('/containers/json', params)
+
+    async def inspect_container(self, container: str) -> dict:
+        return await self.get(f'/containers/{quote(container)}/json')
+
+    async def inspect_image(self, image: str) -> dict:
+        return await self.get(f'/images/{quote(image, safe="")}/json')
+
+    async def container_stats(self, container: str) -> dict:
+        return await self.get(f'/containers/{quote(container)}/stats', {'stream': '0'})
+
+    async def get(self, path: str, params: dict = None, timeout: float = None) -> Any:
+        query = f'?{urlencode(params)}' if params else ''
+        url = f'/v{self._api_version}{path}{query}'
+        endpoint = docker_endpoint(path)
+        start = time.perf_counter()
+        status, body = await asyncio.wait_for(self._request('GET', url), timeout or self._timeout)
+        DOCKER_REQUESTS.labels('GET', endpoint, status).inc()
+        DOCKER_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
+        if status == 404:
+            raise docker.errors.NotFound(f'{status} Client Error for {url}: {body.decode()}')
+        if status >= 400:
+            raise docker.errors.APIError(f'{status} Error for {url}: {body.decode()}')
+        return json.loads(body) if body else None
+
+    # --- internals
+
+    def _negotiate(self):
+        if self._api_version is None:
+            # negotiated once by the shared (blocking) client
+            self._api_version = DockerClients.get().api.api_version
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                Thread(target=loop.run_forever, name='AsyncDockerClient', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._base_url.scheme in ['unix', 'http+unix']:
+            return await asyncio.open_unix_connection(self._base_url.path)
+        return await asyncio.open_connection(self._base_url.hostname, self._base_url.port or 2375)
+
+    async def _request(self, method: str, url: str) -> Tuple[int, bytes]:
+        if self._slots is None:
+            # created here so that it belongs to our loop
+            self._slots = asyncio.Semaphore(self._pool_size)
+        async with self._slots:
+            while self._idle:
+                reader, writer = self._idle.pop()
+                try:
+                    return await self._exchange(reader, writer, method, url)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # the engine dropped this idle connection, try the next one
+                    continue
+            reader, writer = await self._connect()
+            return await self._exchange(reader, writer, method, url)
+
+    async def _exchange(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        method: str, url: str) -> Tuple[int, bytes]:
+        try:
+            writer.write(f'{method} {url} HTTP/1.1\r\nHost: docker\r\n\r\n'.encode('ascii'))
+            await writer.drain()
+            status, headers, body = await self._read_response(reader)
+        except BaseException:
+            writer.close()
+            raise
+        # keep the connection for the next request (unless the engine is closing it)
+        if headers.get('connection', '').lower() == 'close':
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, body
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, dict, bytes]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('The Docker engine closed the connection')
+        status = int(status_line.split(b' ')[1])
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+        # body
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            return status, headers, b''.join(chunks)
+        length = int(headers.get('content-length', 0))
+        return status, headers, (await reader.readexactly(length)) if length > 0 else b''
+
+
+AsyncDocker = AsyncDockerClient()
+
+__all__ = [
+    'AsyncDocker',
+    'AsyncDockerClient'
+]
@@ -0,0 +1,132 @@
+import time
+import logging
+from threading import Lock, Thread, Timer
+
+import docker
+import docker.errors
+from docker.constants import DEFAULT_TIMEOUT_SECONDS
+import requests
+import requests.exceptions
+
+from .constants import DOCKER_ENDPOINT, DOCKER_CLIENT_POOL_SIZE, DOCKER_CLIENT_HEALTHCHECK_SEC
+from .metrics import DOCKER_REQUESTS, DOCKER_LATENCY, docker_endpoint
+
+
+class DockerClientManager(object):
+    """
+    Keeps a single Docker client (and its connection pool) shared by all the threads of the
+    process. The engine is pinged at most once every `healthcheck_sec` seconds, in the
+    background, and a new client replaces the current one whenever the engine stops answering
+    (e.g., the Docker daemon was restarted). Callers never wait for a health check.
+    """
+
+    def __init__(self, base_url: str = DOCKER_ENDPOINT, pool_size: int = DOCKER_CLIENT_POOL_SIZE,
+                 healthcheck_sec: float = DOCKER_CLIENT_HEALTHCHECK_SEC):
+        self._base_url = base_url
+        self._pool_size = pool_size
+        self._healthcheck_sec = healthcheck_sec
+        self._client = None
+        self._last_healthcheck = 0
+        self._checking = False
+        self._lock = Lock()
+        self._logger = logging.getLogger('CodeAPI:Docker')
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    def get(self) -> docker.DockerClient:
+        client = self._client
+        if client is None:
+            with self._lock:
+                # somebody else might have connected while we were waiting for the lock
+                if self._client is None:
+                    self._client = self._connect()
+                return self._client
+        if (time.time() - self._last_healthcheck) > self._healthcheck_sec:
+            with self._lock:
+                check = not self._checking
+                self._checking = True
+            if check:
+                Thread(target=self._healthcheck, args=(client,), daemon=True,
+                       name='DockerHealthCheck').start()
+        return client
+
+    def invalidate(self):
+        # forces a reconnection the next time a client is requested
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            self._retire(client)
+
+    def open(self) -> docker.DockerClient:
+        # dedicated client, for long-lived streams that would otherwise hold a pooled connection
+        return self._instrument(docker.DockerClient(base_url=self._base_url, max_pool_size=1))
+
+    def _connect(self) -> docker.DockerClient:
+        client = docker.DockerClient(base_url=self._base_url, max_pool_size=self._pool_size)
+        self._last_healthcheck = time.time()
+        return self._instrument(client)
+
+    @staticmethod
+    def _instrument(client: docker.DockerClient) -> docker.DockerClient:
+        # the low-level client is a `requests` session, its hooks see every response
+        client.api.hooks['response'].append(_observe_response)
+        return client
+
+    def _healthcheck(self, client: docker.DockerClient):
+        try:
+            if self._healthy(client):
+                return
+            self._logger.warning('Docker engine is not responding, reconnecting...')
+            try:
+                new_client = self._connect()
+            except (docker.errors.DockerException, requests.exceptions.RequestException):
+                # keep the current client, we try again at the next health check
+                self._logger.warning('Could not reconnect to the Docker engine.')
+                return
+            with self._lock:
+                # the client might have been replaced (e.g., invalidated) in the meantime
+                if self._client is client:
+                    client, self._client = self._client, new_client
+                else:
+                    client = new_client
+            self._retire(client)
+        finally:
+            self._last_healthcheck = time.time()
+            self._checking = False
+
+    def _healthy(self, client: docker.DockerClient) -> bool:
+        try:
+            client.ping()
+            return True
+        except (docker.errors.DockerException, requests.exceptions.RequestException):
+            return False
+
+    def _retire(self, client: docker.DockerClient):
+        # other threads might still be using the client, close it once their requests timed out
+        timer = Timer(DEFAULT_TIMEOUT_SECONDS, self._close, (client,))
+        timer.daemon = True
+        timer.start()
+
+    @staticmethod
+    def _close(client: docker.DockerClient):
+        # noinspection PyBroadException
+        try:
+            client.close()
+        except BaseException:
+            pass
+
+
+def _observe_response(response: requests.Response, *_, **__):
+    endpoint = docker_endpoint(response.request.path_url)
+    DOCKER_REQUESTS.labels(response.request.method, endpoint, response.status_code).inc()
+    DOCKER_LATENCY.labels(endpoint).observe(response.elapsed.total_seconds())
+
+
+DockerClients = DockerClientManager()
+
+__all__ = [
+    'DockerClients',
+    'DockerClientManager'
+]
@@ -0,0 +1,112 @@
+import queue
+import time
+from threading import Lock
+from typing import Iterator, Union, Dict
+
+from .constants import EVENTS_BUFFER_SIZE
+
+
+class EventSubscription(object):
+    """
+    A listener on the event bus. Events are queued (up to `maxsize`, the oldest ones are
+    dropped beyond that). Events of the same `kind` and `key` that arrive within `min_interval`
+    seconds from each other are coalesced, only the most recent one is delivered.
+    """
+
+    def __init__(self, bus: 'EventBus', coalesce: set, min_interval: float,
+                 maxsize: int = EVENTS_BUFFER_SIZE):
+        self._bus = bus
+        self._coalesce = coalesce
+        self._min_interval = min_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._dropped = 0
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def offer(self, event: dict):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                pass
+            try:
+                self._queue.get_nowait()
+                self._dropped += 1
+            except queue.Empty:
+                pass
+
+    def events(self, heartbeat_sec: float) -> Iterator[Union[dict, None]]:
+        # yields `None` every `heartbeat_sec` seconds of silence
+        pending: Dict[tuple, dict] = {}
+        last_sent: Dict[tuple, float] = {}
+        while True:
+            now = time.time()
+            # deliver coalesced events that waited long enough
+            for key, event in list(pending.items()):
+                if now - last_sent.get(key, 0) >= self._min_interval:
+                    del pending[key]
+                    last_sent[key] = now
+                    yield event
+            # wait for the next event (or for the next coalesced event to be due)
+            timeout = heartbeat_sec
+            if len(pending) > 0:
+                timeout = max(0.0, min(
+                    last_sent.get(key, 0) + self._min_interval - now for key in pending
+                ))
+            try:
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if len(pending) <= 0:
+                    yield None
+                continue
+            key = (event['type'], event.get('module', None))
+            if event['type'] in self._coalesce:
+                pending[key] = event
+                continue
+            # other events are delivered right away, after what is pending for the same module
+            for pkey in [k for k in pending if k[1] == key[1]]:
+                last_sent[pkey] = time.time()
+                yield pending.pop(pkey)
+            yield event
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class EventBus(object):
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = Lock()
+
+    def subscribe(self, coalesce: set = None, min_interval: float = 0) -> EventSubscription:
+        subscription = EventSubscription(self, coalesce or set(), min_interval)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event_type: str, **data):
+        # no one is listening, most of the time
+        if len(self._subscriptions) <= 0:
+            return
+        event = {'type': event_type, 'time': time.time(), **data}
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(event)
+
+
+Events = EventBus()
+
+__all__ = [
+    'Events',
+    'EventBus',
+    'EventSubscription'
+]
@@ -0,0 +1,15 @@
+import os
+import threading
+
+
+def atomic_write(path: str, data: bytes):
+    # write to a temporary file first so that readers never see partial files
+    tmp_path = f'{path}.tmp.{os.getpid()}.{threading.get_ident()}'
+    with open(tmp_path, 'wb') as fout:
+        fout.write(data)
+    os.replace(tmp_path, path)
+
+
+__all__ = [
+    'atomic_write'
+]
@@ -1,18 +1,28 @@
-from code_api.knowledge_base import KnowledgeBase
-
 from .update_checker import UpdateCheckerWorker
 from .update_module import UpdateModuleWorker
 from .run_container import RunContainerWorker
+from .docker_events import DockerEvents
+from .container_monitor import ContainerMonitorWorker
+from .prefetch import PrefetchWorker
+from .scheduler import Scheduler
+from .pull_queue import PullQueue
 from .base import Job
+from .registry import Jobs
 
 
 def get_job(name) -> Job:
-    return KnowledgeBase.get('jobs', name) if KnowledgeBase.has('jobs', name) else None
+    return Jobs.get(name)
 
 
 __all__ = [
     'get_job',
+    'Jobs',
     'UpdateCheckerWorker',
     'UpdateModuleWorker',
-    'RunContainerWorker'
+    'RunContainerWorker',
+    'DockerEvents',
+    'ContainerMonitorWorker',
+    'PrefetchWorker',
+    'Scheduler',
+    'PullQueue'
 ]
\ No newline at end of file
@@ -1,24 +1,133 @@
+import time
+import inspect
 import logging
+import functools
+from threading import Condition
+from typing import Callable, Iterator
 
 from code_api import logger
-from code_api.knowledge_base import KnowledgeBase
+from code_api.constants import JobState
+from code_api.metrics import JOB_STEPS, JOB_STEP_LATENCY
+
+from .registry import Jobs
 
 
 class Job(object):
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # every step of every job is timed
+        if 'step' in cls.__dict__:
+            cls.step = _timed_step(cls.step)
+
     def __init__(self, name):
         self._name = name
         self._logger = logging.getLogger(self._name)
         self._logger.setLevel(logger.level)
+        # lifecycle
+        self._state = JobState.PENDING
+        self._error = None
+        self._created = time.time()
+        self._started = None
+        self._finished = None
+        self._state_changed = Condition()
         # register job
-        KnowledgeBase.set('jobs', name, self)
+        Jobs.register(self)
 
     @property
     def name(self):
         return self._name
 
+    @property
+    def state(self) -> JobState:
+        return self._state
+
+    @property
+    def error(self):
+        return self._error
+
+    @property
+    def created(self) -> float:
+        return self._created
+
+    @property
+    def started(self):
+        return self._started
+
+    @property
+    def finished(self):
+        return self._finished
+
+    def mark_running(self):
+        with self._state_changed:
+            self._started = time.time()
+            self._set_state(JobState.RUNNING)
+
+    def mark_succeeded(self):
+        with self._state_changed:
+            self._finished = time.time()
+            self._set_state(JobState.SUCCEEDED)
+
+    def mark_failed(self, error: str = None):
+        with self._state_changed:
+            self._error = error
+            self._finished = time.time()
+            self._set_state(JobState.FAILED)
+
+    def wait(self, timeout: float) -> bool:
+        # returns whether the job is finished
+        with self._state_changed:
+            return self._state_changed.wait_for(lambda: self._state.finished, timeout)
+
+    def info(self) -> dict:
+        return {
+            'name': self._name,
+            'type': type(self).__name__,
+            'state': self._state.name,
+            'error': self._error,
+            'created': self._created,
+            'started': self._started,
+            'finished': self._finished
+        }
+
     def is_time(self):
         raise NotImplementedError("The method 'Job.is_time' must be redefined by the subclass.")
 
     def step(self):
         pass
+
+    def _set_state(self, state: JobState):
+        self._state = state
+        self._state_changed.notify_all()
+
+
+def _timed_step(step: Callable) -> Callable:
+
+    def _observe(job: Job, start: float, result: str):
+        job_type = type(job).__name__
+        JOB_STEP_LATENCY.labels(job_type).observe(time.perf_counter() - start)
+        JOB_STEPS.labels(job_type, result).inc()
+
+    def _generator(job: Job, steps: Iterator, start: float) -> Iterator:
+        # steps that report their progress are timed until they are exhausted
+        result = 'error'
+        try:
+            yield from steps
+            result = 'ok'
+        finally:
+            _observe(job, start, result)
+
+    @functools.wraps(step)
+    def _step(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            out = step(self, *args, **kwargs)
+        except BaseException:
+            _observe(self, start, 'error')
+            raise
+        if inspect.isgenerator(out):
+            return _generator(self, out, start)
+        _observe(self, start, 'ok')
+        return out
+
+    return _step
@@ -0,0 +1,119 @@
+import time
+import traceback
+from threading import RLock
+from typing import Union, List
+
+from code_api.utils import get_client
+from code_api.knowledge_base import KnowledgeBase
+from code_api.constants import CONTAINERS_RECONCILE_EVERY_SEC
+
+from .base import Job
+from .docker_events import DockerEvents
+from .scheduler import Scheduler
+
+CONTAINER_EVENTS = [
+    'create', 'start', 'restart', 'die', 'stop', 'kill', 'pause', 'unpause', 'rename', 'destroy'
+]
+
+
+class ContainerMonitorJob(Job):
+    """
+    Keeps the state of the containers in the `containers` group of the KB (indexed by name),
+    using the Docker events to stay up-to-date and a periodic full listing to reconcile.
+    """
+
+    def __init__(self):
+        super().__init__('ContainerMonitorJob')
+        self._last_sync = 0
+        self._lock = RLock()
+        DockerEvents.subscribe('container', CONTAINER_EVENTS, self._on_container_event)
+
+    @property
+    def synced(self) -> bool:
+        return self._last_sync > 0
+
+    def age(self) -> float:
+        # seconds since the cache was last known to be in sync with the engine
+        if DockerEvents.connected and self._last_sync >= DockerEvents.connected_since:
+            return 0.0
+        return time.time() - self._last_sync
+
+    def get(self, name_or_id: str) -> Union[dict, None]:
+        container = KnowledgeBase.get('containers', name_or_id, None)
+        if container is not None:
+            return container
+        # the engine also accepts (partial) container IDs, as long as they are not ambiguous
+        matches = [c for _, c in KnowledgeBase.get('containers') if c['id'].startswith(name_or_id)]
+        if len(matches) > 1:
+            raise LookupError(f"Multiple containers match the ID prefix '{name_or_id}'")
+        return matches[0] if matches else None
+
+    def list(self, status: str = None) -> List[dict]:
+        return [
+            c for _, c in KnowledgeBase.get('containers') if status is None or c['status'] == status
+        ]
+
+    def is_time(self) -> bool:
+        if DockerEvents.connected and self._last_sync < DockerEvents.connected_since:
+            # we (re)connected to the events stream, some events might have been missed
+            return True
+        return (time.time() - self._last_sync) > CONTAINERS_RECONCILE_EVERY_SEC
+
+    def step(self):
+        with self._lock:
+            sync_time = time.time()
+            containers = {
+                c['name']: c for c in map(self._record, get_client().api.containers(all=True))
+            }
+            for name, _ in KnowledgeBase.get('containers'):
+                if name not in containers:
+                    KnowledgeBase.remove('containers', name)
+            for name, container in containers.items():
+                KnowledgeBase.set('containers', name, container)
+            self._last_sync = sync_time
+
+    def _on_container_event(self, event: dict):
+        container_id = event.get('id', None) or event.get('Actor', {}).get('ID', None)
+        if container_id is None:
+            return
+        with self._lock:
+            # the new record comes first, readers see the old one until it is replaced
+            records = [] if event['Action'] == 'destroy' else [
+                self._record(c)
+                for c in get_client().api.containers(all=True, filters={'id': container_id})
+            ]
+            names = {record['name'] for record in records}
+            for record in records:
+                KnowledgeBase.set('containers', record['name'], record)
+            # drop the old record if the container was renamed or is gone
+            for name, container in KnowledgeBase.get('containers'):
+                if container['id'] == container_id and name not in names:
+                    KnowledgeBase.remove('containers', name)
+
+    @staticmethod
+    def _record(container: dict) -> dict:
+        return {
+            'id': container['Id'],
+            'name': (container.get('Names', None) or ['/'])[0].lstrip('/'),
+            'image': container.get('Image', None),
+            'status': container.get('State', None),
+            'labels': container.get('Labels', None) or {}
+        }
+
+
+class ContainerMonitorWorker(object):
+
+    def __init__(self):
+        self._job = ContainerMonitorJob()
+        self._heartbeat_hz = 0.5
+
+    def start(self):
+        self._job.mark_running()
+        Scheduler.call_every(1.0 / self._heartbeat_hz, self._work)
+
+    def _work(self):
+        if self._job.is_time():
+            try:
+                self._job.step()
+            except BaseException:
+                traceback.print_exc()
@@ -0,0 +1,98 @@
+import time
+import traceback
+from collections import defaultdict
+from threading import Thread
+from typing import Callable, Dict, List
+
+from dt_class_utils import DTProcess
+
+from code_api import logger
+from code_api.docker_client import DockerClients
+
+
+class DockerEventsWorker(Thread):
+    """
+    Follows the Docker events stream and dispatches events to the subscribed handlers.
+    Handlers are called on this thread, they should return quickly.
+
+    NOTE: the server-side filters are computed when the stream is opened, subscribe
+          before starting the worker.
+    """
+
+    def __init__(self):
+        self._alive = True
+        self._heartbeat_hz = 0.2
+        self._handlers: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+        self._actions: Dict[str, set] = defaultdict(set)
+        self._stream = None
+        self._connected_since = 0
+        super(DockerEventsWorker, self).__init__(target=self._work, daemon=True)
+
+    @property
+    def connected(self) -> bool:
+        return self._stream is not None
+
+    @property
+    def connected_since(self) -> float:
+        # events that happened before this time might have been missed
+        return self._connected_since
+
+    def subscribe(self, event_type: str, actions: List[str], handler: Callable[[dict], None]):
+        self._handlers[event_type].append(handler)
+        self._actions[event_type].update(actions)
+
+    def start(self):
+        # register shutdown callback
+        DTProcess.get_instance().register_shutdown_callback(self._shutdown)
+        super(DockerEventsWorker, self).start()
+
+    def _shutdown(self):
+        self._alive = False
+        stream = self._stream
+        if stream is not None:
+            stream.close()
+
+    def _work(self):
+        while self._alive:
+            client = None
+            # noinspection PyBroadException
+            try:
+                client = DockerClients.open()
+                self._stream = client.events(decode=True, filters={
+                    'type': list(self._handlers.keys()),
+                    'event': list(set.union(set(), *self._actions.values()))
+                })
+                self._connected_since = time.time()
+                logger.debug('Listening to the Docker events stream')
+                for event in self._stream:
+                    self._dispatch(event)
+            except BaseException:
+                if self._alive:
+                    logger.warning('The Docker events stream was interrupted, '
+                                   'reconnecting...\n' + traceback.format_exc())
+            finally:
+                self._stream = None
+                if client is not None:
+                    client.close()
+            # ---
+            if self._alive:
+                time.sleep(1.0 / self._heartbeat_hz)
+
+    def _dispatch(self, event: dict):
+        event_type = event.get('Type', None)
+        if event.get('Action', None) not in self._actions.get(event_type, set()):
+            return
+        for handler in self._handlers.get(event_type, []):
+            # noinspection PyBroadException
+            try:
+                handler(event)
+            except BaseException:
+                traceback.print_exc()
+
+
+DockerEvents = DockerEventsWorker()
+
+__all__ = [
+    'DockerEvents',
+    'DockerEventsWorker'
+]
@@ -0,0 +1,164 @@
+import time
+import traceback
+from functools import partial
+from threading import Lock
+from typing import Dict, Set
+
+import docker.errors
+
+from code_api.utils import get_client
+from code_api.registry import Registry
+from code_api.knowledge_base import KnowledgeBase, DTModule
+from code_api.pull_progress import PullProgress
+from code_api.metrics import PULL_BYTES, PULL_LATENCY
+from code_api.constants import ModuleStatus, PREFETCH_UPDATES, PREFETCH_EVERY_MIN, \
+    PREFETCH_DISK_BUDGET_MB
+
+from .base import Job
+from .scheduler import Scheduler
+from .pull_queue import PullQueue, PullTicket
+
+
+class PrefetchJob(Job):
+    """
+    Downloads the images of the modules that are BEHIND ahead of time, by digest (so that the
+    local tag, and what runs, is left untouched) and at low priority. Once an image is there, the
+    module is marked as staged and its update only needs to recreate the containers.
+    """
+
+    def __init__(self):
+        super().__init__('PrefetchJob')
+        self._budget = PREFETCH_DISK_BUDGET_MB * 1024 * 1024
+        self._staged_bytes: Dict[str, int] = {}
+        self._in_flight: Set[str] = set()
+        self._last_time_checked = 0
+        self._lock = Lock()
+
+    @property
+    def staged_bytes(self) -> int:
+        with self._lock:
+            return sum(self._staged_bytes.values())
+
+    def info(self) -> dict:
+        with self._lock:
+            staged = dict(self._staged_bytes)
+        return {
+            **super().info(),
+            'staged': staged,
+            'budget': self._budget
+        }
+
+    def is_time(self) -> bool:
+        if not PREFETCH_UPDATES:
+            return False
+        return (time.time() - self._last_time_checked) > PREFETCH_EVERY_MIN * 60
+
+    def step(self):
+        self._last_time_checked = time.time()
+        for name, module in KnowledgeBase.get('modules'):
+            with self._lock:
+                # forget about modules that are not staged anymore (e.g., they were updated)
+                if module.staged is None:
+                    self._staged_bytes.pop(name, None)
+                if name in self._in_flight:
+                    continue
+            if module.status != ModuleStatus.BEHIND:
+                continue
+            # the HEAD request for the digest does not count against the DockerHub limits
+            digest = module.remote_digest()
+            if digest is None or digest == module.staged:
+                continue
+            # a newer version was released after we staged the previous one
+            if module.staged is not None:
+                self._unstage(module)
+            # maybe we already have it (e.g., we staged it before a restart)
+            repository, _ = module.repository_and_tag()
+            exists = self._exists(f'{repository}@{digest}')
+            # the manifest is only fetched when there is a chance to use it
+            if not exists and self.staged_bytes >= self._budget:
+                self._logger.info(f'Module {name} not prefetched, disk budget exhausted.')
+                continue
+            # the manifest GETs count against the same DockerHub limits as the update checks
+            if not Registry.has_budget():
+                self._logger.info('Registry requests budget exhausted, prefetching postponed.')
+                return
+            layers = module.remote_layers()
+            size = sum(layers.values())
+            if exists:
+                module.stage(digest, layers)
+                with self._lock:
+                    self._staged_bytes[name] = size
+                continue
+            if self.staged_bytes + size > self._budget:
+                self._logger.info(f'Module {name} not prefetched, disk budget exhausted.')
+                continue
+            with self._lock:
+                self._in_flight.add(name)
+            callback = partial(self._pull, module=module, digest=digest, layers=layers)
+            PullQueue.enqueue(name, set(layers), callback, low_priority=True)
+
+    def _pull(self, ticket: PullTicket, module: DTModule, digest: str, layers: Dict[str, int]):
+        try:
+            # the user might have started the update while we were waiting in the queue
+            if module.status != ModuleStatus.BEHIND:
+                return
+            repository, _ = module.repository_and_tag()
+            self._logger.info(f'Prefetching module {module.name} ({digest})...')
+            pull = PullProgress(layers)
+            for step in get_client().api.pull(repository, digest, stream=True, decode=True):
+                if 'error' in step:
+                    self._logger.warning(f'Could not prefetch module {module.name}: '
+                                         f'{step["error"]}')
+                    return
+                pull.update(step)
+            pull.finish()
+            PULL_BYTES.labels(module.name).inc(pull.downloaded_bytes)
+            PULL_LATENCY.labels(module.name).observe(pull.duration)
+            module.stage(digest, layers)
+            with self._lock:
+                self._staged_bytes[module.name] = sum(layers.values())
+            self._logger.info(f'Module {module.name} staged ({pull.downloaded_bytes} bytes '
+                              f'in {pull.duration:.1f} seconds).')
+        except (docker.errors.APIError, Exception):
+            traceback.print_exc()
+        finally:
+            ticket.release()
+            with self._lock:
+                self._in_flight.discard(module.name)
+
+    def _unstage(self, module: DTModule):
+        repository, _ = module.repository_and_tag()
+        try:
+            # only the reference by digest goes, the image stays if something else uses it
+            get_client().images.remove(f'{repository}@{module.staged}')
+        except docker.errors.APIError:
+            pass
+        module.stage(None)
+        with self._lock:
+            self._staged_bytes.pop(module.name, None)
+
+    @staticmethod
+    def _exists(image: str) -> bool:
+        try:
+            get_client().images.get(image)
+            return True
+        except docker.errors.APIError:
+            return False
+
+
+class PrefetchWorker(object):
+
+    def __init__(self):
+        self._job = PrefetchJob()
+        self._heartbeat_hz = 0.1
+
+    def start(self):
+        self._job.mark_running()
+        Scheduler.call_every(1.0 / self._heartbeat_hz, self._work)
+
+    def _work(self):
+        if self._job.is_time():
+            try:
+                self._job.step()
+            except BaseException:
+                traceback.print_exc()
@@ -0,0 +1,123 @@
+from threading import Lock
+from typing import Callable, Dict, List, Set
+
+from code_api.constants import UPDATE_PULL_CONCURRENCY
+
+from .scheduler import Scheduler
+
+
+class PullTicket(object):
+    """
+    A place in the pull queue. The callback runs (on the scheduler pool) when the ticket is
+    admitted, the ticket must be released as soon as the image is pulled.
+    """
+
+    def __init__(self, queue: 'ImagePullQueue', module: str, layers: Set[str],
+                 callback: Callable, low_priority: bool = False):
+        self._queue = queue
+        self._module = module
+        self._layers = layers
+        self._callback = callback
+        self._low_priority = low_priority
+        self._released = False
+
+    @property
+    def module(self) -> str:
+        return self._module
+
+    @property
+    def layers(self) -> Set[str]:
+        return self._layers
+
+    @property
+    def low_priority(self) -> bool:
+        return self._low_priority
+
+    def overlaps(self, other: 'PullTicket') -> bool:
+        return len(self._layers & other.layers) > 0
+
+    def run(self):
+        try:
+            self._callback(self)
+        finally:
+            # the callback might have forgotten (or never made it to the pull)
+            self.release()
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._queue.release(self)
+
+
+class ImagePullQueue(object):
+    """
+    Global queue of the image pulls. At most `concurrency` pulls run at the same time, and two
+    pulls that share layers to download never do (the second one finds the shared layers already
+    on disk), so the bandwidth is not split among downloads of the same bytes. Layers that are
+    already on disk are left out of the tickets by whoever enqueues them. Tickets are admitted in
+    order, except that a ticket can overtake older ones it shares no layers with. Low priority
+    tickets (e.g., prefetching) are only admitted when nothing else is pulling or waiting.
+    """
+
+    def __init__(self, concurrency: int = UPDATE_PULL_CONCURRENCY):
+        self._concurrency = concurrency
+        self._waiting: List[PullTicket] = []
+        self._active: List[PullTicket] = []
+        self._lock = Lock()
+
+    def enqueue(self, module: str, layers: Set[str], callback: Callable,
+                low_priority: bool = False) -> PullTicket:
+        ticket = PullTicket(self, module, layers, callback, low_priority)
+        with self._lock:
+            self._waiting.append(ticket)
+        self._admit()
+        return ticket
+
+    def release(self, ticket: PullTicket):
+        with self._lock:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            if ticket in self._active:
+                self._active.remove(ticket)
+        self._admit()
+
+    def position(self, ticket: PullTicket) -> int:
+        # 0 when the pull is running
+        with self._lock:
+            return self._waiting.index(ticket) + 1 if ticket in self._waiting else 0
+
+    def stats(self) -> Dict[str, List[str]]:
+        with self._lock:
+            return {
+                'active': [t.module for t in self._active],
+                'waiting': [t.module for t in self._waiting]
+            }
+
+    def _admit(self):
+        admitted = []
+        with self._lock:
+            for ticket in list(self._waiting):
+                if len(self._active) >= self._concurrency:
+                    break
+                if ticket.low_priority and (len(self._active) > 0 or any(
+                        not t.low_priority for t in self._waiting)):
+                    continue
+                # wait for the pulls (running or ahead of us) we share layers with
+                blockers = self._active + self._waiting[:self._waiting.index(ticket)]
+                if any(ticket.overlaps(other) for other in blockers):
+                    continue
+                self._waiting.remove(ticket)
+                self._active.append(ticket)
+                admitted.append(ticket)
+        for ticket in admitted:
+            Scheduler.submit(ticket.run)
+
+
+PullQueue = ImagePullQueue()
+
+__all__ = [
+    'PullQueue',
+    'PullTicket',
+    'ImagePullQueue'
+]
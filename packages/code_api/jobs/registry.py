@@ -0,0 +1,66 @@
+import time
+from threading import Lock
+from typing import List, Union, TYPE_CHECKING
+
+from code_api.knowledge_base import KnowledgeBase
+from code_api.constants import JobState, JOBS_TTL_SEC, JOBS_HISTORY_SIZE
+
+if TYPE_CHECKING:
+    # `base` registers its jobs here
+    from .base import Job
+
+
+class JobRegistry(object):
+    """
+    Jobs live in the `jobs` group of the KB. Finished jobs are kept for `ttl` seconds and no more
+    than `history` of them are kept at any time (the oldest ones go first), so the group does not
+    grow with the uptime. The group only grows on `register`, so that is where the eviction runs,
+    reads just hide the jobs that expired since.
+    """
+
+    def __init__(self, ttl: int = JOBS_TTL_SEC, history: int = JOBS_HISTORY_SIZE):
+        self._ttl = ttl
+        self._history = history
+        self._lock = Lock()
+
+    def register(self, job: 'Job'):
+        KnowledgeBase.set('jobs', job.name, job)
+        self.evict()
+
+    def get(self, name: str) -> Union['Job', None]:
+        job = KnowledgeBase.get('jobs', name, None)
+        return None if job is None or self._expired(job, time.time()) else job
+
+    def list(self, state: JobState = None) -> List['Job']:
+        now = time.time()
+        return [
+            job for _, job in KnowledgeBase.get('jobs')
+            if (state is None or job.state == state) and not self._expired(job, now)
+        ]
+
+    def evict(self):
+        now = time.time()
+        with self._lock:
+            finished = sorted(
+                (job for _, job in KnowledgeBase.get('jobs') if job.state.finished),
+                key=lambda j: j.finished
+            )
+            # expired jobs, and the oldest ones beyond the history size
+            overflow = max(0, len(finished) - self._history)
+            for i, job in enumerate(finished):
+                if i >= overflow and not self._expired(job, now):
+                    continue
+                # a newer job might have taken the same name
+                if KnowledgeBase.get('jobs', job.name, None) is job:
+                    KnowledgeBase.remove('jobs', job.name)
+
+    def _expired(self, job: 'Job', now: float) -> bool:
+        return job.state.finished and (now - job.finished) > self._ttl
+
+
+Jobs = JobRegistry()
+
+__all__ = [
+    'Jobs',
+    'JobRegistry'
+]
@@ -2,26 +2,18 @@ import json
 import uuid
 import time
 import traceback
-from threading import Thread, Semaphore
+from threading import Semaphore
 import docker.errors
 
-from dt_class_utils import DTProcess
-
 from code_api import logger
-from code_api.constants import STATIC_MODULE_CFG, DT_MODULE_TYPE, ContainerStatus
+from code_api.constants import STATIC_MODULE_CFG, DT_MODULE_TYPE, ContainerStatus, JobState
 from code_api.knowledge_base import DTModule
 from code_api.utils import get_client, dt_label, indent_str, \
     docker_compose_to_docker_sdk_config, dt_launcher
 
 from .base import Job
-
-GOOD_CONTAINER_STATES = [
-    ContainerStatus.UNKNOWN,
-    ContainerStatus.CREATED,
-    ContainerStatus.RUNNING,
-    ContainerStatus.PAUSED,
-    ContainerStatus.RESTARTING
-]
+from .registry import Jobs
+from .scheduler import Scheduler, ScheduledCall
 
 
 class RunContainerJob(Job):
@@ -43,7 +35,27 @@ class RunContainerJob(Job):
 
     @property
     def status(self):
-        return self._container_status
+        # the containers monitor follows the Docker events, there is no need to poll the engine
+        monitor = Jobs.get('ContainerMonitorJob')
+        if self._container is None or monitor is None or not monitor.synced:
+            return self._container_status
+        container = monitor.get(self._container.id)
+        if container is None:
+            return ContainerStatus.REMOVED
+        try:
+            return ContainerStatus.from_string(container['status'])
+        except KeyError:
+            return ContainerStatus.UNKNOWN
+
+    def info(self) -> dict:
+        return {
+            **super().info(),
+            'module': self._module.name,
+            'container': {
+                'name': self._container.name if self._container else self._container_name,
+                'status': self.status.name
+            }
+        }
 
     def is_time(self):
         return self._container is None
@@ -53,13 +65,7 @@ class RunContainerJob(Job):
         # lock
         self._lock.acquire()
         if not self.is_time():
-            # update status
-            try:
-                self._container.reload()
-                self._container_status = ContainerStatus.from_string(self._container.status)
-            except (docker.errors.NotFound, KeyError):
-                self._container_status = ContainerStatus.REMOVED
-            # release lock
+            # the container is already there
             self._lock.release()
             return True, None
         # make sure the container name is not taken
@@ -69,12 +75,17 @@ class RunContainerJob(Job):
                 # start container if stopped
                 if container.status in ['exited', 'dead', 'created']:
                     container.start()
+                    self._container = container
+                    self._lock.release()
                     return True, None
                 # resume container if paused
                 if container.status in ['paused']:
                     container.unpause()
+                    self._container = container
+                    self._lock.release()
                     return True, None
                 # if we are here, it means that we found another container with the same name
+                self._lock.release()
                 return False, f'Container `{self._container_name}` already exists.'
             except (docker.errors.NotFound, docker.errors.APIError):
                 pass
@@ -131,44 +142,46 @@ class RunContainerJob(Job):
         return True, None
 
 
-class RunContainerWorker(Thread):
+class RunContainerWorker(object):
 
     def __init__(self, module: DTModule, configuration: str = 'default', launcher: str = 'default',
                  container_name: str = None, custom_configuration: dict = None):
-        self._alive = True
         self._module = module
         self._heartbeat_hz = 0.2
         # create job
         self._job = RunContainerJob(self._module, configuration, launcher, container_name,
                                     custom_configuration)
-        super(RunContainerWorker, self).__init__(target=self._work)
-        # register shutdown callback
-        DTProcess.get_instance().register_shutdown_callback(self._shutdown)
+        self._call = ScheduledCall(Scheduler, time.time(), self._work, (),
+                                   interval=1.0 / self._heartbeat_hz)
 
     @property
     def job(self):
         return self._job
 
+    def start(self):
+        Scheduler.schedule(self._call)
+
     def _shutdown(self):
-        self._alive = False
+        self._call.cancel()
+        logger.debug(f'Worker {self._job.name}[Worker] terminated.')
 
     def _work(self):
-        while self._alive:
-            success, message = self._job.step()
-            # on error
-            if not success:
-                msg = f'An error occurred while performing the job {self._job.name}.'
-                if message is not None:
-                    msg += f'\nThe error reads:\n{indent_str(message)}\n'
-                logger.error(msg)
-                # terminate this worker
-                self._shutdown()
-                continue
-            # on container stopped
-            if self._job.status not in GOOD_CONTAINER_STATES:
-                # terminate this worker
-                self._shutdown()
-                continue
-            # ---
-            time.sleep(1.0 / self._heartbeat_hz)
-        logger.debug(f'Worker {self._job.name}[Worker] terminated.')
+        if self._job.state == JobState.PENDING:
+            self._job.mark_running()
+        success, message = self._job.step()
+        # on error
+        if not success:
+            msg = f'An error occurred while performing the job {self._job.name}.'
+            if message is not None:
+                msg += f'\nThe error reads:\n{indent_str(message)}\n'
+            logger.error(msg)
+            if not self._job.state.finished:
+                self._job.mark_failed(message or msg)
+            # terminate this worker
+            self._shutdown()
+            return
+        # the container is up, its status is followed by the containers monitor from now on
+        if not self._job.state.finished:
+            self._job.mark_succeeded()
+        # terminate this worker
+        self._shutdown()
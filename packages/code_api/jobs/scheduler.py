@@ -0,0 +1,147 @@
+import heapq
+import itertools
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Thread, Condition, Lock
+from typing import Callable, Union
+
+from dt_class_utils import DTProcess
+
+from code_api.constants import JOBS_WORKERS
+
+
+class ScheduledCall(object):
+    """
+    A callback on the timer queue of the scheduler. Periodic calls are put back on the queue
+    `interval` seconds after the previous run ended, so runs of the same call never overlap.
+    """
+
+    def __init__(self, scheduler: 'JobScheduler', due: float, fn: Callable, args: tuple,
+                 interval: Union[float, None] = None):
+        self._scheduler = scheduler
+        self._fn = fn
+        self._args = args
+        self._interval = interval
+        self._cancelled = False
+        self.due = due
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def periodic(self) -> bool:
+        return self._interval is not None
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        if self._cancelled:
+            return
+        # noinspection PyBroadException
+        try:
+            self._fn(*self._args)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            if self.periodic and not self._cancelled:
+                self.due = time.time() + self._interval
+                self._scheduler.schedule(self)
+
+
+class JobScheduler(object):
+    """
+    Runs the background jobs on a bounded pool of threads. Delayed and periodic callbacks wait
+    on a timer queue (a heap ordered by due time) served by a single timer thread, so the number
+    of threads does not grow with the number of jobs and containers.
+    """
+
+    def __init__(self, workers: int = JOBS_WORKERS):
+        self._workers = workers
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = Condition(Lock())
+        self._pool = None
+        self._timer = None
+        self._alive = True
+
+    @property
+    def alive(self) -> bool:
+        return self._alive
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        # runs `fn` on the pool as soon as a thread is available
+        self._ensure_started()
+        return self._pool.submit(fn, *args)
+
+    def call_later(self, delay: float, fn: Callable, *args) -> ScheduledCall:
+        call = ScheduledCall(self, time.time() + delay, fn, args)
+        return self.schedule(call)
+
+    def call_every(self, interval: float, fn: Callable, *args, delay: float = 0) -> ScheduledCall:
+        call = ScheduledCall(self, time.time() + delay, fn, args, interval=interval)
+        return self.schedule(call)
+
+    def schedule(self, call: ScheduledCall) -> ScheduledCall:
+        self._ensure_started()
+        with self._cond:
+            if not self._alive:
+                call.cancel()
+                return call
+            heapq.heappush(self._queue, (call.due, next(self._counter), call))
+            # wake up the timer, this might be the new earliest call
+            self._cond.notify()
+        return call
+
+    def shutdown(self):
+        with self._cond:
+            self._alive = False
+            self._queue.clear()
+            self._cond.notify()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def _ensure_started(self):
+        with self._cond:
+            if self._timer is not None:
+                return
+            self._pool = ThreadPoolExecutor(self._workers, thread_name_prefix='JobScheduler')
+            self._timer = Thread(target=self._work, name='JobScheduler[timer]', daemon=True)
+            self._timer.start()
+        # register shutdown callback
+        DTProcess.get_instance().register_shutdown_callback(self.shutdown)
+
+    def _work(self):
+        while self._alive:
+            with self._cond:
+                # drop cancelled calls, wait for the earliest one to be due
+                while self._queue and self._queue[0][2].cancelled:
+                    heapq.heappop(self._queue)
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                timeout = self._queue[0][0] - time.time()
+                if timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+                _, _, call = heapq.heappop(self._queue)
+            try:
+                self._pool.submit(call.run)
+            except RuntimeError:
+                # the pool was shut down
+                return
+
+
+Scheduler = JobScheduler()
+
+__all__ = [
+    'Scheduler',
+    'JobScheduler',
+    'ScheduledCall'
+]
@@ -1,24 +1,40 @@
 import re
 import time
 import traceback
-from threading import Thread
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from threading import BoundedSemaphore, Lock, RLock
+from typing import Dict, Union, Set
+
+import docker.errors
+from docker.models.images import Image as DockerImage
 
-from dt_class_utils import DTProcess
 from dt_module_utils import set_module_unhealthy, set_module_healthy
 
 from code_api.utils import \
     get_client, \
     get_endpoint_architecture, \
     get_duckietown_distro, \
+    get_registry, \
     dt_label, \
     parse_time
 from code_api.knowledge_base import KnowledgeBase, DTModule
-from code_api.constants import ModuleStatus, CHECK_UPDATES_EVERY_MIN
+from code_api.registry import Registry
+from code_api.snapshots import ModuleSnapshots
+from code_api.constants import ModuleStatus, CHECK_UPDATES_EVERY_MIN, CHECK_UPDATES_WORKERS, \
+    CHECK_UPDATES_PER_REGISTRY, CHECK_UPDATES_DEADLINE_SEC, CHECK_UPDATES_BY_DIGEST, \
+    MODULES_RECONCILE_EVERY_MIN
 
 from .base import Job
+from .docker_events import DockerEvents
+from .scheduler import Scheduler
+from .update_scheduler import UpdateCheckScheduler
 
 SOLID_STATUS = [ModuleStatus.UPDATED, ModuleStatus.BEHIND, ModuleStatus.AHEAD]
 FROZEN_STATUS = [ModuleStatus.UPDATING, ModuleStatus.ERROR]
+# how often we rescan the images while the events stream is not available
+DISCOVERY_RETRY_SEC = 60
 
 
 class UpdateCheckerJob(Job):
@@ -27,81 +43,85 @@ class UpdateCheckerJob(Job):
         super().__init__('UpdateCheckerJob')
         self._check_interval_time_sec = CHECK_UPDATES_EVERY_MIN * 60
         self._last_time_checked = 0
-        # open Docker client
-        self._docker = get_client()
         arch = get_endpoint_architecture()
         self._image_pattern = re.compile(f'^duckietown/(.+):{get_duckietown_distro()}-{arch}$')
+        # remote inspections run in parallel, with a cap on the requests to the same registry
+        self._inspector = RemoteInspector()
+        # modules are checked when the scheduler says so, within the DockerHub limits
+        self._scheduler = UpdateCheckScheduler()
+        # modules are discovered as images are pulled/tagged/removed
+        self._last_discovery = 0
+        self._discovery_pending = False
+        self._discovery_lock = RLock()
+        DockerEvents.subscribe('image', ['tag', 'untag', 'pull', 'delete'], self._on_image_event)
         # ---
-        self._logger.info('[DISABLED] Updates checker set to check for updates every '
+        self._logger.info('Updates checker set to check for updates every '
                           '%d minutes' % CHECK_UPDATES_EVERY_MIN)
+        # restore what we knew before the last restart
+        self._warm_start()
+
+    @property
+    def scheduler(self) -> UpdateCheckScheduler:
+        return self._scheduler
 
     def is_time(self) -> bool:
-        # given the new DockerHub limits, it is never a good time to auto-check for updates
-        return self._last_time_checked == 0
-        # disabled
-        # return (time.time() - self._last_time_checked) > self._check_interval_time_sec
+        # look for new modules (with a full rescan) when we cannot rely on events alone
+        if self._needs_discovery():
+            return True
+        # the scheduler spreads the checks so that we do not burst through the DockerHub limits
+        return len(self._scheduler.due(exclude=self._unavailable())) > 0
 
-    def step(self):
-        self._logger.info('Rechecking the status of modules...')
+    def step(self, force: bool = False):
         self._last_time_checked = time.time()
 
-        # fetch list of images at the Docker endpoint
-        images = list(self._docker.images.list())
-        self._logger.debug('Found %d total images' % len(images))
+        # new modules are discovered through the Docker events, a full rescan is a reconciliation
+        if force or self._needs_discovery():
+            self._discover()
 
-        # we only update official duckietown images
-        compatible_tags = set()
-        for image in images:
-            if len(image.tags) <= 0:
-                continue
-            found = False
-            module_name = None
-            module_tag = None
-            # check all the tags
-            for tag in image.tags:
-                match = self._image_pattern.match(tag)
-                if not match:
-                    continue
-                # this is a valid duckietown tag
-                module_name = match.group(1)
-                module_tag = tag
-                compatible_tags.add(tag)
-                KnowledgeBase.set('tags', module_name, tag)
-                # check if there is already a tracked module with the same name
-                if KnowledgeBase.has('modules', module_name):
-                    module = KnowledgeBase.get('modules', module_name)
-                    if module.image.id == image.id:
-                        self._logger.debug('Module %s is still there' % module_name)
-                        # the image is already in the KB, change its status to UNKNOWN
-                        if module.status not in SOLID_STATUS + FROZEN_STATUS:
-                            module.status = ModuleStatus.UNKNOWN
-                        found = True
-                        break
-            # add a new module to the KB if this is a new image
-            if not found and module_tag is not None:
-                KnowledgeBase.set('modules', module_name, DTModule(image, module_tag))
-                self._logger.info(' - Tracking new module %s' % module_name)
-
-        # clean KB by removing tracked modules that are not there anymore
-        to_be_removed = set()
-        for name, module in KnowledgeBase.get('modules'):
-            tag = KnowledgeBase.get('tags', name)
-            if tag not in compatible_tags and module.status not in FROZEN_STATUS:
-                self._logger.info(' - Untracking module %s' % tag)
-                to_be_removed.add(name)
-        for name in to_be_removed:
-            KnowledgeBase.remove('modules', name)
+        # we leave modules that are updating (or still being inspected) alone, the others are
+        # checked when they are due
+        for name, _ in KnowledgeBase.get('modules'):
+            self._scheduler.track(name)
+        unavailable = self._unavailable()
+        due = set(self._scheduler.due(exclude=unavailable))
+        to_check = {
+            name: module for name, module in KnowledgeBase.get('modules')
+            if name not in unavailable and (force or name in due)
+        }
+        if len(to_check) <= 0:
+            return
+        self._logger.info('Rechecking the status of %d modules...' % len(to_check))
 
-        self._logger.info('Tracking %d total modules' % len(list(KnowledgeBase.get('modules'))))
+        # do not touch the registry when we are out of budget
+        if not force and not self._scheduler.has_budget():
+            self._logger.warning('Registry requests budget exhausted, checks postponed '
+                                 '(budget: %s)' % self._scheduler.budget())
+            for name in to_check:
+                self._scheduler.postpone(name)
+            return
+
+        # fetch remote image labels (in parallel)
+        all_remote_labels = self._inspector.inspect(to_check)
+        missed = len(to_check) - len(all_remote_labels)
+        if missed > 0:
+            self._logger.warning('Could not inspect %d modules within %d seconds' % (
+                missed, CHECK_UPDATES_DEADLINE_SEC))
+        self._logger.debug('Registry requests so far: %s' % Registry.stats)
 
         # check which modules need update
-        for name, module in KnowledgeBase.get('modules'):
-            # we leave modules that are updating alone
+        for name, module in to_check.items():
+            # we leave modules that started updating in the meantime alone
             if module.status in FROZEN_STATUS:
                 continue
 
+            # modules we could not inspect in time are retried soon (but not right away)
+            if name not in all_remote_labels:
+                self._scheduler.retry(name)
+                continue
+            self._scheduler.checked(name)
+
             # fetch remote image labels
-            remote_labels = module.remote_labels()
+            remote_labels = all_remote_labels[name]
             if remote_labels is None:
                 self._logger.debug('Could not get remote labels for module %s' % name)
                 # image is not available online
@@ -160,30 +180,226 @@ class UpdateCheckerJob(Job):
                 # the remote copy is newer than the local
                 module.status = ModuleStatus.BEHIND
 
+        # store the new state of the modules
+        for name, module in to_check.items():
+            self._save_snapshot(name, module)
+
+    def _unavailable(self) -> Set[str]:
+        frozen = {name for name, module in KnowledgeBase.get('modules')
+                  if module.status in FROZEN_STATUS}
+        return frozen | self._inspector.in_flight
+
+    def _needs_discovery(self) -> bool:
+        if self._discovery_pending or not DockerEvents.connected or \
+                self._last_discovery < DockerEvents.connected_since:
+            return (time.time() - self._last_discovery) > DISCOVERY_RETRY_SEC
+        return (time.time() - self._last_discovery) > MODULES_RECONCILE_EVERY_MIN * 60
+
+    def _warm_start(self):
+        # noinspection PyBroadException
+        try:
+            self._discover()
+        except BaseException:
+            traceback.print_exc()
+            return
+        restored = 0
+        for name, module in KnowledgeBase.get('modules'):
+            snapshot = ModuleSnapshots.load(name)
+            if snapshot is None or not module.restore(snapshot):
+                continue
+            # modules restored from a snapshot are not checked again until they are due
+            self._scheduler.track(name, last_check=snapshot.get('last_check', 0))
+            restored += 1
+        self._logger.info('Restored the state of %d modules from snapshots' % restored)
+
+    def _save_snapshot(self, name: str, module: DTModule):
+        # transient states are not worth saving
+        if module.status in FROZEN_STATUS + [ModuleStatus.UNKNOWN]:
+            return
+        ModuleSnapshots.save(name, {
+            **module.snapshot(),
+            'last_check': self._scheduler.state(name)['last_check']
+        })
+
+    def _discover(self):
+        with self._discovery_lock:
+            self._last_discovery = time.time()
+            self._discovery_pending = False
+            # fetch list of images at the Docker endpoint
+            images = list(get_client().images.list())
+            self._logger.debug('Found %d total images' % len(images))
+
+            # we only update official duckietown images
+            compatible_tags = set()
+            for image in images:
+                compatible_tags.update(self._track_image(image))
+
+            # clean KB by removing tracked modules that are not there anymore
+            to_be_removed = set()
+            for name, module in KnowledgeBase.get('modules'):
+                tag = KnowledgeBase.get('tags', name)
+                if tag not in compatible_tags and module.status not in FROZEN_STATUS:
+                    to_be_removed.add(name)
+            for name in to_be_removed:
+                self._untrack(name)
+
+            self._logger.info('Tracking %d total modules' % KnowledgeBase.size('modules'))
+
+    def _on_image_event(self, event: dict):
+        with self._discovery_lock:
+            client = get_client()
+            if event['Action'] in ['tag', 'pull']:
+                # `id` is the image ID for `tag` events and the image name for `pull` events
+                try:
+                    image = client.images.get(event['id'])
+                except docker.errors.ImageNotFound:
+                    return
+                self._track_image(image)
+                return
+            # `untag` and `delete` events: check whether our tags still point to the same images
+            for name, module in KnowledgeBase.get('modules'):
+                if module.image.id != event['id']:
+                    continue
+                try:
+                    image = client.images.get(module.tag)
+                except docker.errors.ImageNotFound:
+                    if module.status not in FROZEN_STATUS:
+                        self._untrack(name)
+                    continue
+                self._track_image(image)
+
+    def _track_image(self, image: DockerImage) -> Set[str]:
+        compatible_tags = set()
+        found = False
+        module_name = None
+        module_tag = None
+        # check all the tags
+        for tag in image.tags:
+            match = self._image_pattern.match(tag)
+            if not match:
+                continue
+            # this is a valid duckietown tag
+            module_name = match.group(1)
+            module_tag = tag
+            compatible_tags.add(tag)
+            KnowledgeBase.set('tags', module_name, tag)
+            # check if there is already a tracked module with the same name
+            if KnowledgeBase.has('modules', module_name):
+                module = KnowledgeBase.get('modules', module_name)
+                if module.image.id == image.id:
+                    self._logger.debug('Module %s is still there' % module_name)
+                    # the image is already in the KB, change its status to UNKNOWN
+                    if module.status not in SOLID_STATUS + FROZEN_STATUS:
+                        module.status = ModuleStatus.UNKNOWN
+                    found = True
+                    break
+                if module.status in FROZEN_STATUS:
+                    # the module is being updated, it will be replaced at the next discovery
+                    self._discovery_pending = True
+                    found = True
+                    break
+        # add a new module to the KB if this is a new image
+        if not found and module_tag is not None:
+            module = DTModule(image, module_tag)
+            # what we know about the last update survives the new image
+            previous = KnowledgeBase.get('modules', module_name, None)
+            if previous is not None:
+                module.last_update = previous.last_update
+            KnowledgeBase.set('modules', module_name, module)
+            # new images are checked right away
+            self._scheduler.forget(module_name)
+            self._logger.info(' - Tracking new module %s' % module_name)
+        return compatible_tags
+
+    def _untrack(self, name: str):
+        self._logger.info(' - Untracking module %s' % name)
+        KnowledgeBase.remove('modules', name)
+        self._scheduler.forget(name)
+        ModuleSnapshots.remove(name)
+
+
+class RemoteInspector(object):
+    """
+    Inspects remote images in parallel, with a cap on the requests to the same registry and a
+    deadline. Inspections that miss the deadline cannot be interrupted, they finish in the
+    background (every request to a registry has a timeout) and their modules are not inspected
+    again until they do, so that a slow registry does not pile up requests.
+    """
+
+    def __init__(self, workers: int = CHECK_UPDATES_WORKERS,
+                 per_registry: int = CHECK_UPDATES_PER_REGISTRY,
+                 deadline: float = CHECK_UPDATES_DEADLINE_SEC):
+        self._workers = ThreadPoolExecutor(workers, thread_name_prefix='UpdateChecker')
+        self._registry_locks = defaultdict(lambda: BoundedSemaphore(per_registry))
+        self._deadline = deadline
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = Lock()
 
-class UpdateCheckerWorker(Thread):
+    @property
+    def in_flight(self) -> Set[str]:
+        # modules whose inspection missed the deadline and is still running
+        with self._lock:
+            return set(self._in_flight)
+
+    def inspect(self, modules: Dict[str, DTModule]) -> Dict[str, Union[dict, None]]:
+        # labels of the modules inspected in time (None when they could not be reached)
+        futures = {}
+        labels = {}
+        in_flight = self.in_flight
+        for name, module in modules.items():
+            if name in in_flight:
+                continue
+            repository, _ = module.repository_and_tag()
+            if repository is None:
+                # nothing to look for
+                labels[name] = None
+                continue
+            registry_lock = self._registry_locks[get_registry(repository)]
+            futures[self._workers.submit(self._remote_labels, module, registry_lock)] = name
+        done, not_done = wait(futures, timeout=self._deadline)
+        for future in not_done:
+            # inspections still in the queue are dropped, running ones are left to finish
+            if future.cancel():
+                continue
+            name = futures[future]
+            with self._lock:
+                self._in_flight[name] = future
+            future.add_done_callback(partial(self._landed, name))
+        for future in done:
+            labels[futures[future]] = future.result() if future.exception() is None else None
+        return labels
+
+    def _landed(self, name: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(name, None) is future:
+                del self._in_flight[name]
+
+    @staticmethod
+    def _remote_labels(module: DTModule, registry_lock: BoundedSemaphore) -> Union[dict, None]:
+        with registry_lock:
+            if CHECK_UPDATES_BY_DIGEST:
+                digest = module.remote_digest()
+                if digest is not None and digest in module.local_digests():
+                    # the remote tag points to our image, its labels are the same as ours
+                    return module.labels()
+            return module.remote_labels()
+
+
+class UpdateCheckerWorker(object):
 
     def __init__(self):
-        self._alive = True
         self._job = UpdateCheckerJob()
-        self._sleeping_time_sec = CHECK_UPDATES_EVERY_MIN * 60
-        self._last_time_checked = 0
         self._heartbeat_hz = 0.5
-        super(UpdateCheckerWorker, self).__init__(target=self._work)
-        # register shutdown callback
-        DTProcess.get_instance().register_shutdown_callback(self._shutdown)
 
-    def _shutdown(self):
-        self._alive = False
+    def start(self):
+        self._job.mark_running()
+        Scheduler.call_every(1.0 / self._heartbeat_hz, self._work)
 
     def _work(self):
-        while self._alive:
-            if self._job.is_time():
-                try:
-                    self._job.step()
-                    set_module_healthy()
-                except BaseException:
-                    set_module_unhealthy()
-                    traceback.print_exc()
-            # ---
-            time.sleep(1.0 / self._heartbeat_hz)
+        if self._job.is_time():
+            try:
+                self._job.step()
+                set_module_healthy()
+            except BaseException:
+                set_module_unhealthy()
+                traceback.print_exc()
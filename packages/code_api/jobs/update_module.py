@@ -2,31 +2,58 @@ import json
 import math
 import time
 import traceback
-from threading import Thread
-import docker.errors
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Set, Union, List, Callable, Iterator, Tuple, Any
 
-from dt_class_utils import DTProcess
+import docker.errors
+from docker.models.containers import Container as DockerContainer
 
 from code_api import logger
-from code_api.constants import ModuleStatus, STATIC_MODULE_CFG, DT_MODULE_TYPE
+from code_api.constants import ModuleStatus, STATIC_MODULE_CFG, DT_MODULE_TYPE, \
+    UPDATE_RECREATE_WORKERS
 from code_api.knowledge_base import DTModule
+from code_api.pull_progress import PullProgress
+from code_api.metrics import PULL_BYTES, PULL_LATENCY
 from code_api.utils import get_client, get_container_config, dt_label, indent_str, \
     docker_compose_to_docker_sdk_config
 
 
 from .base import Job
+from .scheduler import Scheduler
+from .pull_queue import PullQueue, PullTicket
 
 
 class UpdateModuleJob(Job):
 
     def __init__(self, module: DTModule):
         self._module = module
+        self._layers = None
+        self._last_pull = None
+        self._downtime = None
         super().__init__('UpdateModuleJob[%s]' % self._module.name)
 
+    def info(self) -> dict:
+        pull = self._module.pull
+        return {
+            **super().info(),
+            'module': self._module.name,
+            'pull': pull.summary() if pull is not None else self._last_pull,
+            'downtime': self._downtime
+        }
+
     def is_time(self):
         return True
 
-    def step(self):
+    def layers(self) -> Set[str]:
+        # what the pull queue needs to know to keep modules downloading the same bytes from racing
+        self._layers = self._module.remote_layers()
+        # layers we already have (e.g., the base image shared by all modules) are not downloaded
+        layers = set(self._layers) - self._module.local_layers()
+        # the module itself, two updates of the same module never run at the same time
+        layers.add(self._module.tag)
+        return layers
+
+    def step(self, ticket: PullTicket = None, digest: str = None):
         module_name = self._module.name
         # noinspection PyBroadException
         try:
@@ -48,21 +75,35 @@ class UpdateModuleJob(Job):
             logger.debug('Module {}: Pulling new image.'.format(module_name))
             repository, tag = self._module.repository_and_tag()
             image_name = '{}:{}'.format(repository, tag)
-            total_layers = set()
-            completed_layers = set()
+            # a staged image is pulled by digest (i.e., it is already there) and then tagged
+            reference = digest if digest is not None else tag
+            # progress is measured in bytes, layer sizes come from the manifest (the prefetcher
+            # already read it for a staged image)
+            layers = self._layers
+            if layers is None and digest is not None:
+                layers = self._module.staged_layers
+            pull = PullProgress(layers if layers is not None else self._module.remote_layers())
+            self._module.pull = pull
             try:
-                for step in client.api.pull(repository, tag, stream=True, decode=True):
+                for step in client.api.pull(repository, reference, stream=True, decode=True):
                     if 'error' in step:
                         return
                     if 'status' not in step or 'id' not in step:
                         continue
-                    total_layers.add(step['id'])
-                    if step['status'] in ['Pull complete', 'Already exists']:
-                        completed_layers.add(step['id'])
+                    pull.update(step)
                     # compute progress
-                    if len(total_layers) > 0:
-                        progress = 5 + int(80 * len(completed_layers) / len(total_layers))
-                        yield True, substep, progress
+                    yield True, substep, 5 + int(80 * pull.fraction)
+                pull.finish()
+                if digest is not None:
+                    client.api.tag(f'{repository}@{digest}', repository, tag)
+                PULL_BYTES.labels(module_name).inc(pull.downloaded_bytes)
+                PULL_LATENCY.labels(module_name).observe(pull.duration)
+                self._last_pull = {
+                    'duration': round(pull.duration, 1),
+                    'bytes': pull.downloaded_bytes,
+                    'time': time.time()
+                }
+                self._module.last_update = self._last_pull
             except (docker.errors.APIError, Exception):
                 msg = 'An error occurred while pulling a new version of the module ' + module_name
                 logger.error(
@@ -72,6 +113,11 @@ class UpdateModuleJob(Job):
                 )
                 yield False, msg, -1
                 return
+            finally:
+                self._module.pull = None
+                # let the next module in the queue pull while we recreate the containers
+                if ticket is not None:
+                    ticket.release()
             yield True, substep, 85
 
             # step 2.1 [+0-15%]: do not rename/remove/recreate THIS container
@@ -82,142 +128,83 @@ class UpdateModuleJob(Job):
                 yield True, 'Finished', 100
                 return
 
-            # step 3 [+5%]: stop and rename containers
-            substep = 'Renamig old containers'
-            logger.info('Module {}: Renaming old containers.'.format(module_name))
-            i = 0
-            containers_to_recreate = {}
-            containers_to_start = set()
-            for container in containers:
-                try:
-                    container.reload()
-                    old_name = container.name
-                    if container.status == 'running':
-                        logger.debug('Module {}: Stopping container {}.'.format(
-                            module_name, old_name
+            # steps 3-5 run on a pool, a module is recreated in the time of its slowest container
+            with ThreadPoolExecutor(UPDATE_RECREATE_WORKERS,
+                                    thread_name_prefix=f'UpdateModule[{module_name}]') as pool:
+
+                # step 3 [+5%]: create the new containers (the old ones are still running)
+                substep = 'Creating new containers'
+                logger.info('Module {}: Creating new containers.'.format(module_name))
+                candidates = [ContainerSwap(self._module, c, image_name) for c in containers]
+                swaps = []
+                msg = None
+                i = 0
+                for swap, prepared, error in _run_all(pool, candidates, ContainerSwap.prepare):
+                    if error is not None:
+                        msg = msg or (str(error) if isinstance(error, ValueError) else
+                                      'An error occurred while creating the new container for ' +
+                                      swap.name)
+                        logger.error('{}.\nThe error reads:\n{}'.format(
+                            msg, indent_str(_format_exception(error))
                         ))
-                        container.stop()
-                        containers_to_start.add(old_name)
-                    new_temp_name = old_name + ('' if old_name.endswith('-old') else '-old')
-                    logger.debug('Module {}: Renaming container {} -> {}.'.format(
-                        module_name, old_name, new_temp_name
-                    ))
-                    container.rename(new_temp_name)
-                    containers_to_recreate[old_name] = container
-                except docker.errors.NotFound:
-                    # the container is gone, that is OK
-                    pass
-                # ---
-                yield True, substep, int(math.floor(85 + 5 * (i / len(containers))))
-                i += 1
-            yield True, substep, 90
-
-            # step 4 [+5%]: recreate containers
-            substep = 'Creating new containers'
-            logger.info('Module {}: Recreate containers.'.format(module_name))
-            i = 0
-            containers_to_remove = []
-            for container_name, old_container in containers_to_recreate.items():
-                # get current container configuration
-                labels = self._module.labels()
-                current_configuration_name = old_container.labels.get(
-                    dt_label('container.configuration'), 'default')
-                # get configuration from image
-                configuration = labels.get(
-                    dt_label(f'image.configuration.{current_configuration_name}'), None)
-                if configuration is None:
-                    # reverting to `default`
-                    configuration = labels.get(dt_label(f'image.configuration.default'), None)
-                # if we still don't have a configuration, throw an error
-                if configuration is None:
-                    msg = f'The module {module_name} has no configurations declared. ' \
-                          f'Cannot recreate container `{container_name}`.'
-                    logger.error(msg)
+                        continue
+                    if prepared:
+                        swaps.append(swap)
+                    # ---
+                    yield True, substep, int(math.floor(85 + 5 * (i / len(candidates))))
+                    i += 1
+                if msg is not None:
+                    # nothing was touched yet, drop what we created so far
+                    list(pool.map(ContainerSwap.rollback, candidates))
                     yield False, msg, -1
                     return
-                # combine image configuration with static container configuration
-                image_configuration = json.loads(configuration)
-                container_cfg = {
-                    **image_configuration,
-                    **STATIC_MODULE_CFG,
-                    'labels': {}
-                }
-                container_cfg = docker_compose_to_docker_sdk_config(container_cfg)
-                # fetch old container configuration (just for logging purposes)
-                old_configuration = get_container_config(old_container)
-                # retain container labels
-                container_cfg['labels'].update({
-                    k: v for k, v in old_configuration['labels'].items()
-                    if k.startswith(dt_label('container.'))
-                })
-                # add label `container.owner`
-                container_cfg['labels'] = {
-                    dt_label('container.owner'): DT_MODULE_TYPE
-                }
-                # retain docker compose labels
-                container_cfg['labels'].update({
-                    k: v for k, v in old_configuration['labels'].items()
-                    if k.startswith('com.docker.compose.')
-                })
-                # print some stats
-                container_cfg['image'] = image_name
-                container_cfg['name'] = container_name
-                logger.info(
-                    "Recreating container {} for module {};\n"
-                    "Old configuration was:\n\n{}\n\n"
-                    "New configuration is:\n\n{}\n".format(
-                        container_name, module_name,
-                        indent_str(json.dumps(old_configuration, sort_keys=True, indent=4)),
-                        indent_str(json.dumps(container_cfg, sort_keys=True, indent=4))
-                    )
-                )
-                # take `remove`, `stdout` and `stderr` out
-                for k in ['remove', 'stdout', 'stderr']:
-                    if k in container_cfg:
-                        del container_cfg[k]
-                # create/run new container
-                try:
-                    new_container = client.containers.create(
-                        **container_cfg
-                    )
-                    if container_name in containers_to_start:
-                        logger.debug('Starting container `{}`.'.format(container_name))
-                        new_container.start()
-                    containers_to_remove.append(old_container)
-                except (docker.errors.ContainerError, docker.errors.ImageNotFound,
-                        docker.errors.APIError):
-                    msg = 'An error occurred while recreating the container ' + container_name
-                    logger.error(
-                        '{}.\nThe error reads:\n{}'.format(
-                            msg, indent_str(traceback.format_exc())
-                        )
-                    )
+                yield True, substep, 90
+
+                # step 4 [+5%]: swap old and new containers (the module is down only in here),
+                # containers are stopped before the ones they depend on, and started after them
+                substep = 'Swapping containers'
+                logger.info('Module {}: Swapping containers.'.format(module_name))
+                i = 0
+                phases = [(ContainerSwap.stop, True), (ContainerSwap.start, False)]
+                for action, reverse in phases:
+                    if msg is not None:
+                        break
+                    for swap, _, error in _run_all(pool, swaps, action, ordered=True,
+                                                   reverse=reverse):
+                        if error is not None:
+                            msg = msg or 'An error occurred while swapping the container ' + \
+                                swap.name
+                            logger.error('{}.\nThe error reads:\n{}\nRolling back.'.format(
+                                msg, indent_str(_format_exception(error))
+                            ))
+                            continue
+                        # ---
+                        yield True, substep, int(math.floor(90 + 5 * (i / (2 * len(swaps)))))
+                        i += 1
+                if msg is not None:
+                    # put the old containers back in place
+                    list(pool.map(ContainerSwap.rollback, swaps))
                     yield False, msg, -1
                     return
-                # ---
-                yield True, substep, int(math.floor(90 + 5 * (i / len(containers_to_recreate))))
-                i += 1
-            yield True, substep, 95
-
-            # step 5 [+5%]: remove old containers
-            substep = 'Removing old containers'
-            logger.debug('Module {}: Removing old containers.'.format(module_name))
-            i = 0
-            for container in containers_to_remove:
-                try:
-                    logger.debug('Module {}: Removing container {}.'.format(
-                        module_name, container.name
-                    ))
-                    container.remove()
-                except (docker.errors.ContainerError, docker.errors.ImageNotFound,
-                        docker.errors.APIError):
-                    logger.warning(
-                        'An error occurred while trying to remove the old container {}.'.format(
-                            container.name
-                        )
-                    )
-                # ---
-                yield True, substep, int(math.floor(95 + 5 * (i / len(containers_to_remove))))
+                self._downtime = {
+                    swap.name: round(swap.downtime, 3)
+                    for swap in swaps if swap.downtime is not None
+                }
+                logger.info('Module {}: Containers swapped, downtime (seconds): {}'.format(
+                    module_name, self._downtime or '(none)'
+                ))
+                if self._last_pull is not None:
+                    self._module.last_update = {**self._last_pull, 'downtime': self._downtime}
+                yield True, substep, 95
+
+                # step 5 [+5%]: remove old containers
+                substep = 'Removing old containers'
+                logger.debug('Module {}: Removing old containers.'.format(module_name))
+                i = 0
+                for _ in _run_all(pool, swaps, ContainerSwap.cleanup):
+                    # ---
+                    yield True, substep, int(math.floor(95 + 5 * (i / len(swaps))))
+                    i += 1
             yield True, 'Finished', 100
             return
         except BaseException:
@@ -233,89 +220,306 @@ class UpdateModuleJob(Job):
             return
 
 
-class UpdateModuleWorker(Thread):
+class ContainerSwap(object):
+    """
+    Replaces a container with a new one (same name, new image) keeping the downtime to the
+    bare minimum: the new container is created next to the old one (which keeps running), and
+    only then the old one is stopped and the two are swapped. Everything can be undone until
+    the old container is removed.
+    """
+
+    def __init__(self, module: DTModule, container: DockerContainer, image_name: str):
+        self._module = module
+        self._old = container
+        self._new = None
+        self._image_name = image_name
+        self._name = container.name
+        self._was_running = False
+        self._stopped = False
+        self._old_renamed = False
+        self._downtime = None
+        self._stop_time = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def project(self) -> Union[str, None]:
+        return self._old.labels.get('com.docker.compose.project', None)
+
+    @property
+    def service(self) -> Union[str, None]:
+        return self._old.labels.get('com.docker.compose.service', None)
+
+    @property
+    def depends_on(self) -> Set[str]:
+        # e.g., `db:service_started:false,cache:service_healthy:true`
+        value = self._old.labels.get('com.docker.compose.depends_on', '')
+        return {dep.split(':')[0] for dep in value.split(',') if dep.strip()}
+
+    def depends(self, other: 'ContainerSwap') -> bool:
+        return other is not self and other.project == self.project and \
+            other.service is not None and other.service in self.depends_on
+
+    @property
+    def downtime(self) -> Union[float, None]:
+        # seconds between stopping the old container and starting the new one
+        return self._downtime
+
+    def prepare(self) -> bool:
+        # returns False if the container is gone, that is OK
+        try:
+            self._old.reload()
+        except docker.errors.NotFound:
+            return False
+        self._name = self._old.name
+        self._was_running = self._old.status == 'running'
+        container_cfg = self._configuration()
+        container_cfg['name'] = f'{self._name}-next'
+        self._remove_leftover(container_cfg['name'])
+        logger.debug('Creating container `{}`.'.format(container_cfg['name']))
+        self._new = get_client().containers.create(**container_cfg)
+        return True
+
+    @staticmethod
+    def _remove_leftover(name: str):
+        # an update that crashed (or was killed) might have left its new container behind
+        try:
+            container = get_client().containers.get(name)
+        except docker.errors.NotFound:
+            return
+        owner = container.labels.get(dt_label('container.owner'), None)
+        if owner is None or owner != DT_MODULE_TYPE:
+            # not ours, creating the new container fails with a clear error
+            return
+        logger.warning('Removing the container `{}` left behind by a previous update.'.format(
+            name))
+        container.remove(force=True)
+
+    def stop(self):
+        # the old container steps aside, the new one takes its name
+        self._stop_time = time.time()
+        if self._was_running:
+            logger.debug('Stopping container `{}`.'.format(self._name))
+            self._old.stop()
+            self._stopped = True
+        old_temp_name = self._name + ('' if self._name.endswith('-old') else '-old')
+        self._old.rename(old_temp_name)
+        self._old_renamed = True
+        self._new.rename(self._name)
+
+    def start(self):
+        if self._was_running:
+            logger.debug('Starting container `{}`.'.format(self._name))
+            self._new.start()
+            self._downtime = time.time() - self._stop_time
+
+    def rollback(self):
+        # noinspection PyBroadException
+        try:
+            if self._new is not None:
+                self._new.remove(force=True)
+                self._new = None
+            if self._old_renamed:
+                self._old.rename(self._name)
+                self._old_renamed = False
+            if self._stopped:
+                self._old.start()
+                self._stopped = False
+        except BaseException:
+            logger.error('Could not roll back the container {}.\nThe error reads:\n{}'.format(
+                self._name, indent_str(traceback.format_exc())
+            ))
+
+    def cleanup(self):
+        try:
+            logger.debug('Removing container {}.'.format(self._old.name))
+            self._old.remove()
+        except (docker.errors.ContainerError, docker.errors.ImageNotFound,
+                docker.errors.APIError):
+            logger.warning(
+                'An error occurred while trying to remove the old container {}.'.format(
+                    self._old.name
+                )
+            )
+
+    def _configuration(self) -> dict:
+        # get current container configuration
+        labels = self._module.labels()
+        current_configuration_name = self._old.labels.get(
+            dt_label('container.configuration'), 'default')
+        # get configuration from image
+        configuration = labels.get(
+            dt_label(f'image.configuration.{current_configuration_name}'), None)
+        if configuration is None:
+            # reverting to `default`
+            configuration = labels.get(dt_label(f'image.configuration.default'), None)
+        # if we still don't have a configuration, throw an error
+        if configuration is None:
+            raise ValueError(f'The module {self._module.name} has no configurations declared. '
+                             f'Cannot recreate container `{self._name}`.')
+        # combine image configuration with static container configuration
+        image_configuration = json.loads(configuration)
+        container_cfg = {
+            **image_configuration,
+            **STATIC_MODULE_CFG,
+            'labels': {}
+        }
+        container_cfg = docker_compose_to_docker_sdk_config(container_cfg)
+        # fetch old container configuration (just for logging purposes)
+        old_configuration = get_container_config(self._old)
+        # retain container labels
+        container_cfg['labels'].update({
+            k: v for k, v in old_configuration['labels'].items()
+            if k.startswith(dt_label('container.'))
+        })
+        # retain docker compose labels
+        container_cfg['labels'].update({
+            k: v for k, v in old_configuration['labels'].items()
+            if k.startswith('com.docker.compose.')
+        })
+        # add label `container.owner`
+        container_cfg['labels'][dt_label('container.owner')] = DT_MODULE_TYPE
+        # print some stats
+        container_cfg['image'] = self._image_name
+        container_cfg['name'] = self._name
+        logger.info(
+            "Recreating container {} for module {};\n"
+            "Old configuration was:\n\n{}\n\n"
+            "New configuration is:\n\n{}\n".format(
+                self._name, self._module.name,
+                indent_str(json.dumps(old_configuration, sort_keys=True, indent=4)),
+                indent_str(json.dumps(container_cfg, sort_keys=True, indent=4))
+            )
+        )
+        # take `remove`, `stdout` and `stderr` out
+        for k in ['remove', 'stdout', 'stderr']:
+            if k in container_cfg:
+                del container_cfg[k]
+        return container_cfg
+
+
+class UpdateModuleWorker(object):
 
     def __init__(self, module):
-        self._alive = True
-        self._heartbeat_hz = 0.3
         self._module = module
         self._job = UpdateModuleJob(self._module)
-        super(UpdateModuleWorker, self).__init__(target=self._work)
-        # register shutdown callback
-        DTProcess.get_instance().register_shutdown_callback(self._shutdown)
-
-    def _shutdown(self):
-        self._alive = False
-
-    def _work(self):
-        while self._alive:
-            if self._job.is_time():
-                # noinspection PyBroadException
-                try:
-                    # tell everybody we are UPDATING
-                    self._module.status = ModuleStatus.UPDATING
-                    # monitor progress
-                    last_progress = 0
-                    for ok, substep, progress in self._job.step():
-                        if not self._alive:
-                            return
-                        self._module.progress = progress
-                        self._module.step = substep
-                        if not ok:
-                            break
-                        logger.debug('Updating module {}: Progress {:d}% ({})'.format(
-                            self._module.name, progress, substep
-                        ))
-                        last_progress = progress
-
-                    # check if 100 was yielded
-                    if last_progress == 100:
-                        # tell everybody we are done
-                        self._module.status = ModuleStatus.UPDATED
-                    else:
-                        # something weird happened, transition to ERROR state
-                        self._module.status = ModuleStatus.ERROR
-                        # reset status after 10 seconds
-                        UpdateModuleWorkerResetter(self._module).start()
-                    # ---
-                    self._module.progress = 0
-                except BaseException:
-                    msg = 'An error occurred while updating the module ' + self._module.name
-                    # something weird happened, transition to ERROR state
-                    self._module.status = ModuleStatus.ERROR
-                    self._module.step = msg
-                    # reset status after 10 seconds
-                    UpdateModuleWorkerResetter(self._module).start()
-                    # ---
-                    logger.warning(
-                        '{}.\nThe error reads:\n\n{}'.format(
-                            msg, indent_str(traceback.format_exc())
-                        )
-                    )
-                # we are done here
-                return
+
+    @property
+    def job(self):
+        return self._job
+
+    def start(self):
+        # tell everybody we are UPDATING (and waiting for our turn)
+        self._module.status = ModuleStatus.UPDATING
+        self._module.step = 'Queued'
+        self._module.progress = 0
+        Scheduler.submit(self._enqueue)
+
+    def _enqueue(self):
+        staged = self._module.staged
+        if staged is not None and self._module.remote_digest() == staged:
+            # the image was downloaded in advance, there is nothing to wait for
+            self._work(None, staged)
+            return
+        # noinspection PyBroadException
+        try:
+            layers = self._job.layers()
+        except BaseException:
+            layers = {self._module.tag}
+        PullQueue.enqueue(self._module.name, layers, self._work)
+
+    def _reset_later(self):
+        # reset status after 10 seconds
+        Scheduler.call_later(10, self._module.reset)
+
+    def _work(self, ticket: PullTicket, digest: str = None):
+        self._job.mark_running()
+        # noinspection PyBroadException
+        try:
+            # tell everybody we are UPDATING
+            self._module.status = ModuleStatus.UPDATING
+            # monitor progress
+            last_progress = 0
+            for ok, substep, progress in self._job.step(ticket, digest):
+                if not Scheduler.alive:
+                    self._job.mark_failed('Interrupted')
+                    return
+                self._module.progress = progress
+                self._module.step = substep
+                if not ok:
+                    self._job.mark_failed(substep)
+                    break
+                logger.debug('Updating module {}: Progress {:d}% ({})'.format(
+                    self._module.name, progress, substep
+                ))
+                last_progress = progress
+
+            # check if 100 was yielded
+            if last_progress == 100:
+                # tell everybody we are done
+                self._module.status = ModuleStatus.UPDATED
+                self._job.mark_succeeded()
+            else:
+                # something weird happened, transition to ERROR state
+                self._module.status = ModuleStatus.ERROR
+                if not self._job.state.finished:
+                    self._job.mark_failed(self._module.step)
+                self._reset_later()
             # ---
-            time.sleep(1.0 / self._heartbeat_hz)
+            self._module.progress = 0
+        except BaseException:
+            msg = 'An error occurred while updating the module ' + self._module.name
+            # something weird happened, transition to ERROR state
+            self._module.status = ModuleStatus.ERROR
+            self._module.step = msg
+            self._job.mark_failed(msg)
+            self._reset_later()
+            # ---
+            logger.warning(
+                '{}.\nThe error reads:\n\n{}'.format(
+                    msg, indent_str(traceback.format_exc())
+                )
+            )
 
 
-class UpdateModuleWorkerResetter(Thread):
+def _run_all(pool: ThreadPoolExecutor, swaps: List[ContainerSwap], action: Callable,
+             ordered: bool = False, reverse: bool = False) \
+        -> Iterator[Tuple[ContainerSwap, Any, BaseException]]:
+    """
+    Runs `action` on all the given swaps on the pool and yields (swap, result, error) as they
+    complete. With `ordered`, a swap only starts once the swaps it depends on are done, or, with
+    `reverse` as well, once the swaps that depend on it are. Nothing new is started after an error.
+    """
+    pending = list(swaps)
+    running = {}
+    done = set()
+    failed = False
+    while pending or running:
+        if not failed:
+            ready = [
+                s for s in pending
+                if not ordered or not any(
+                    (o.depends(s) if reverse else s.depends(o)) and o not in done for o in swaps
+                )
+            ]
+            if not ready and not running:
+                # dependency cycle, there is no right order
+                ready = list(pending)
+            for swap in ready:
+                pending.remove(swap)
+                running[pool.submit(action, swap)] = swap
+        if not running:
+            break
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            swap = running.pop(future)
+            done.add(swap)
+            error = future.exception()
+            failed = failed or error is not None
+            yield swap, future.result() if error is None else None, error
 
-    def __init__(self, module):
-        self._alive = True
-        self._heartbeat_hz = 0.3
-        self._module = module
-        self._action_time = time.time() + 10
-        super(UpdateModuleWorkerResetter, self).__init__(target=self._work)
-        # register shutdown callback
-        DTProcess.get_instance().register_shutdown_callback(self._shutdown)
-
-    def _shutdown(self):
-        self._alive = False
-
-    def _work(self):
-        while self._alive:
-            if time.time() > self._action_time:
-                # it is action time, reset module status
-                self._module.reset()
-                return
-            time.sleep(1.0 / self._heartbeat_hz)
+
+def _format_exception(error: BaseException) -> str:
+    return ''.join(traceback.format_exception(type(error), error, error.__traceback__))
@@ -0,0 +1,124 @@
+import time
+import random
+from threading import Lock
+from typing import Collection, Dict, List, Union
+
+from code_api.registry import Registry
+from code_api.constants import CHECK_UPDATES_EVERY_MIN, CHECK_UPDATES_JITTER, \
+    CHECK_UPDATES_MIN_BUDGET, CHECK_UPDATES_MAX_BACKOFF, CHECK_UPDATES_RETRY_SEC
+
+
+class UpdateCheckScheduler(object):
+    """
+    Decides when each module should be checked for updates.
+
+    New modules are checked right away, after that each module is rescheduled one interval
+    later plus some random jitter, so that checks spread over time instead of bursting.
+    The interval grows (up to `max_backoff` times) while the registry reports that the
+    number of requests we have left is below `min_budget`, and shrinks back once it is not.
+    Modules that could not be inspected are retried sooner, starting `retry_sec` later and
+    doubling the delay at every failure.
+    """
+
+    def __init__(self, interval_sec: float = CHECK_UPDATES_EVERY_MIN * 60,
+                 jitter: float = CHECK_UPDATES_JITTER, min_budget: int = CHECK_UPDATES_MIN_BUDGET,
+                 max_backoff: int = CHECK_UPDATES_MAX_BACKOFF,
+                 retry_sec: float = CHECK_UPDATES_RETRY_SEC):
+        self._interval_sec = interval_sec
+        self._jitter = jitter
+        self._min_budget = min_budget
+        self._max_backoff = max_backoff
+        self._retry_sec = retry_sec
+        self._backoff = 1
+        # time of the rate limit reading the backoff was last computed from
+        self._rate_limit_seen = None
+        self._next_check: Dict[str, float] = {}
+        self._last_check: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._lock = Lock()
+
+    @property
+    def backoff(self) -> int:
+        return self._backoff
+
+    def track(self, name: str, last_check: float = 0):
+        with self._lock:
+            if name in self._next_check:
+                return
+            self._last_check[name] = last_check
+            self._next_check[name] = last_check + self._delay() if last_check else 0
+
+    def forget(self, name: str):
+        with self._lock:
+            self._next_check.pop(name, None)
+            self._last_check.pop(name, None)
+            self._failures.pop(name, None)
+
+    def due(self, now: float = None, exclude: Collection[str] = ()) -> List[str]:
+        # modules that cannot be checked right now (e.g., they are updating) are left out
+        now = now or time.time()
+        with self._lock:
+            return [name for name, next_check in self._next_check.items()
+                    if next_check <= now and name not in exclude]
+
+    def next_check(self) -> Union[float, None]:
+        with self._lock:
+            return min(self._next_check.values()) if len(self._next_check) > 0 else None
+
+    def has_budget(self) -> bool:
+        self._update_backoff()
+        return Registry.has_budget()
+
+    def checked(self, name: str, now: float = None):
+        now = now or time.time()
+        with self._lock:
+            self._last_check[name] = now
+            self._next_check[name] = now + self._delay()
+            self._failures.pop(name, None)
+
+    def postpone(self, name: str, now: float = None):
+        now = now or time.time()
+        with self._lock:
+            self._next_check[name] = now + self._delay()
+
+    def retry(self, name: str, now: float = None):
+        now = now or time.time()
+        with self._lock:
+            failures = self._failures[name] = self._failures.get(name, 0) + 1
+            delay = min(self._retry_sec * 2 ** (failures - 1), self._interval_sec * self._backoff)
+            self._next_check[name] = now + delay * (1 + random.uniform(0, self._jitter))
+
+    def state(self, name: str) -> dict:
+        with self._lock:
+            return {
+                'last_check': self._last_check.get(name, None) or None,
+                'next_check': self._next_check.get(name, None)
+            }
+
+    def budget(self) -> dict:
+        return {
+            **Registry.rate_limit,
+            'min_budget': self._min_budget,
+            'backoff': self._backoff,
+            'interval_sec': self._interval_sec * self._backoff,
+            'next_check': self.next_check()
+        }
+
+    def _delay(self) -> float:
+        interval = self._interval_sec * self._backoff
+        return interval * (1 + random.uniform(-self._jitter, self._jitter))
+
+    def _update_backoff(self):
+        rate_limit = Registry.rate_limit
+        remaining = rate_limit.get('remaining', None)
+        if remaining is None:
+            return
+        with self._lock:
+            # one step per reading, asking again does not make the registry any busier
+            if rate_limit['updated'] == self._rate_limit_seen:
+                return
+            self._rate_limit_seen = rate_limit['updated']
+            if remaining < self._min_budget:
+                self._backoff = min(self._backoff * 2, self._max_backoff)
+            elif remaining >= 2 * self._min_budget:
+                self._backoff = max(self._backoff // 2, 1)
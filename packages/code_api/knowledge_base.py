@@ -1,49 +1,101 @@
-from typing import Dict, Iterator, Tuple, Any, Union, List
+from threading import Lock
+from types import MappingProxyType
+from typing import Dict, Iterator, Tuple, Any, Union, List, Set, Mapping
 from docker.models.images import Image as DockerImage
 from docker.models.containers import Container as DockerContainer
 
 from .constants import ModuleStatus
-from .utils import inspect_remote_image, dt_label, get_client
+from .events import Events
+from .pull_progress import PullProgress
+from .docker_async import AsyncDocker
+from .registry import Registry
+from .utils import inspect_remote_image, dt_label
 
 
 class NotSet:
     pass
 
 
-class _KnowledgeBase(dict):
+class _Group(object):
+    __slots__ = ('values', 'snapshot')
+
+    def __init__(self):
+        # modified in place (under the lock of the KB)
+        self.values: Dict[str, Any] = {}
+        # read-only copy of `values` handed to readers, taken lazily and dropped on every write
+        self.snapshot: Union[Dict[str, Any], None] = None
+
+
+class _KnowledgeBase(object):
+    """
+    Values are stored in one hash map per group. Writers serialize on a lock and update the map
+    in place, single-key reads never lock. Readers iterating over a group get a snapshot of it,
+    the snapshot is copied when first needed after a write (copy-on-write, but lazily), so
+    writes cost the same no matter how big the group is.
+    """
+
+    def __init__(self):
+        self._groups: Dict[str, _Group] = {}
+        self._lock = Lock()
 
     def get(self, group: str, key: str = None, default: Any = NotSet) -> \
             Union[Iterator[Tuple[str, Any]], Any]:
         if key is not None:
-            key = '/%s/%s' % (group, key)
-            if key not in self:
-                if default != NotSet:
+            value = self._values(group).get(key, NotSet)
+            if value is NotSet:
+                if default is not NotSet:
                     return default
-            return self[key]
+                raise KeyError(key)
+            return value
         # spin up an iterator on the group
         return self.group(group)
 
     def group(self, group: str) -> Iterator[Tuple[str, Any]]:
-        # this avoids issue with long iterations and multi-thread access
-        keys = list(self.keys())
-        # spin up an iterator on the group
-        for key in keys:
-            gkey = '/%s/' % group
-            if key.startswith(gkey):
-                yield key[len(gkey):], self[key]
+        # snapshots are never modified, iterating over one is thread-safe
+        yield from self._snapshot(group).items()
+
+    def snapshot(self, group: str) -> Mapping[str, Any]:
+        return MappingProxyType(self._snapshot(group))
+
+    def size(self, group: str) -> int:
+        return len(self._values(group))
 
     def set(self, group: str, key: str, value: Any):
-        key = '/%s/%s' % (group, key)
-        self[key] = value
+        with self._lock:
+            entry = self._groups.get(group, None)
+            if entry is None:
+                entry = self._groups[group] = _Group()
+            if entry.values.get(key, NotSet) is value:
+                return
+            entry.values[key] = value
+            entry.snapshot = None
 
     def has(self, group: str, key: str) -> bool:
-        key = '/%s/%s' % (group, key)
-        return key in self
+        return key in self._values(group)
 
     def remove(self, group: str, key: str):
-        key = '/%s/%s' % (group, key)
-        if key in self:
-            del self[key]
+        with self._lock:
+            entry = self._groups.get(group, None)
+            if entry is None or key not in entry.values:
+                return
+            del entry.values[key]
+            entry.snapshot = None
+
+    def _values(self, group: str) -> Dict[str, Any]:
+        entry = self._groups.get(group, None)
+        return entry.values if entry is not None else {}
+
+    def _snapshot(self, group: str) -> Dict[str, Any]:
+        entry = self._groups.get(group, None)
+        if entry is None:
+            return {}
+        snapshot = entry.snapshot
+        if snapshot is None:
+            with self._lock:
+                if entry.snapshot is None:
+                    entry.snapshot = dict(entry.values)
+                snapshot = entry.snapshot
+        return snapshot
 
 
 class DTModule(object):
@@ -63,6 +115,10 @@ class DTModule(object):
         self._progress = None
         self._step = None
         self._status = None
+        self._pull = None
+        self._last_update = None
+        self._staged = None
+        self._staged_layers = None
         # ---
         self.reset()
 
@@ -73,7 +129,8 @@ class DTModule(object):
         self._closest_remote_version = 'ND'
         self._progress = None
         self._step = None
-        self._status = ModuleStatus.UNKNOWN
+        self._pull = None
+        self._set_status(ModuleStatus.UNKNOWN)
 
     @property
     def name(self):
@@ -97,7 +154,7 @@ class DTModule(object):
         if not isinstance(status, ModuleStatus):
             raise ValueError("Value of 'status' must be of type code_api.constants.ModuleStatus, "
                              "got %s instead" % str(type(status)))
-        self._status = status
+        self._set_status(status)
 
     @property
     def version(self) -> str:
@@ -129,7 +186,9 @@ class DTModule(object):
 
     @step.setter
     def step(self, step: str):
-        self._step = step
+        if step != self._step:
+            self._step = step
+            self._publish_progress()
 
     @property
     def progress(self) -> int:
@@ -137,7 +196,73 @@ class DTModule(object):
 
     @progress.setter
     def progress(self, progress: int):
-        self._progress = progress
+        if progress != self._progress:
+            self._progress = progress
+            self._publish_progress()
+
+    @property
+    def pull(self) -> Union[PullProgress, None]:
+        # progress of the pull in progress (if any)
+        return self._pull
+
+    @pull.setter
+    def pull(self, pull: Union[PullProgress, None]):
+        self._pull = pull
+
+    @property
+    def last_update(self) -> Union[dict, None]:
+        return self._last_update
+
+    @last_update.setter
+    def last_update(self, last_update: dict):
+        self._last_update = last_update
+
+    @property
+    def staged(self) -> Union[str, None]:
+        # digest of the remote image, when it was downloaded in advance
+        return self._staged
+
+    @property
+    def staged_layers(self) -> Union[Dict[str, int], None]:
+        # digest -> size (in bytes) of the layers of the staged image
+        return self._staged_layers
+
+    def stage(self, digest: Union[str, None], layers: Dict[str, int] = None):
+        # the layers go with the digest, a staged update needs both
+        self._staged, self._staged_layers = digest, layers if digest is not None else None
+
+    def snapshot(self) -> dict:
+        return {
+            'tag': self._tag,
+            'image_id': self._image.id,
+            'status': self._status.name,
+            'remote_version': self._remote_version,
+            'closest_remote_version': self._closest_remote_version
+        }
+
+    def restore(self, snapshot: dict) -> bool:
+        # a snapshot is only valid for the image it was computed against
+        if snapshot.get('image_id', None) != self._image.id:
+            return False
+        if snapshot.get('tag', None) != self._tag:
+            return False
+        try:
+            status = ModuleStatus[snapshot['status']]
+        except KeyError:
+            return False
+        self._remote_version = snapshot.get('remote_version', 'ND')
+        self._closest_remote_version = snapshot.get('closest_remote_version', 'ND')
+        self._set_status(status)
+        return True
+
+    def _set_status(self, status: ModuleStatus):
+        if status == self._status:
+            return
+        self._status = status
+        Events.publish('status', module=self.name, status=status.name, status_txt=self._step)
+
+    def _publish_progress(self):
+        Events.publish('progress', module=self.name, progress=self._progress, step=self._step)
 
     def repository_and_tag(self) -> Union[Tuple[str, str], Tuple[None, None]]:
         try:
@@ -168,6 +293,50 @@ class DTModule(object):
             labels = remote_config['Labels'] if 'Labels' in remote_config else None
         return labels
 
+    def local_digests(self) -> Set[str]:
+        repository, _ = self.repository_and_tag()
+        digests = set()
+        for repo_digest in self._image.attrs.get('RepoDigests', None) or []:
+            repo, _, digest = repo_digest.partition('@')
+            if repo == repository:
+                digests.add(digest)
+        return digests
+
+    def remote_digest(self) -> Union[str, None]:
+        image, tag = self.repository_and_tag()
+        if image is None or tag is None:
+            return None
+        # noinspection PyBroadException
+        try:
+            return Registry.manifest_digest(image, tag)
+        except BaseException:
+            return None
+
+    def remote_layers(self) -> Dict[str, int]:
+        # digest -> size (in bytes) of the layers of the remote image
+        image, tag = self.repository_and_tag()
+        if image is None or tag is None:
+            return {}
+        # noinspection PyBroadException
+        try:
+            manifest = Registry.manifest(image, tag)
+            return {layer['digest']: layer.get('size', 0) for layer in manifest.get('layers', [])}
+        except BaseException:
+            return {}
+
+    def local_layers(self) -> Set[str]:
+        # layers of the installed image, as far as the manifests we have seen before can tell
+        layers = set()
+        for digest in self.local_digests():
+            # noinspection PyBroadException
+            try:
+                manifest = Registry.cached_manifest(digest)
+            except BaseException:
+                continue
+            if manifest is not None:
+                layers.update(layer['digest'] for layer in manifest.get('layers', []))
+        return layers
+
     def containers(self, status='all') -> List[DockerContainer]:
         valid_status = ['all', 'restarting', 'running', 'paused', 'exited']
         if status not in valid_status:
@@ -175,8 +344,8 @@ class DTModule(object):
                 status, ', '.join(valid_status)
             ))
         # ---
-        client = get_client()
-        return client.containers.list(
+        # containers are inspected concurrently (one round-trip instead of one per container)
+        return AsyncDocker.containers(
             all=True,
             filters={
                 'ancestor': self._tag,
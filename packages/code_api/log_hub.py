@@ -0,0 +1,212 @@
+import queue
+from collections import deque
+from threading import Thread, Lock
+from typing import Dict, Iterator, List, Union
+
+from docker.models.containers import Container as DockerContainer
+
+from .constants import LOGS_BUFFER_LINES, LOGS_HUB_RING_LINES
+from .logs import split_lines
+
+# marks the end of a log stream
+_END = object()
+
+
+class LogSubscription(object):
+    """
+    A viewer of a container's logs. Each subscription has its own bounded queue, when the
+    viewer falls behind the oldest lines are dropped (and counted) instead of slowing down
+    the other viewers.
+    """
+
+    def __init__(self, hub: 'ContainerLogHub', backlog: List[bytes],
+                 maxsize: int = LOGS_BUFFER_LINES):
+        self._hub = hub
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._dropped = 0
+        for line in backlog:
+            self.offer(line)
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def offer(self, line):
+        while True:
+            try:
+                self._queue.put_nowait(line)
+                return
+            except queue.Full:
+                pass
+            try:
+                self._queue.get_nowait()
+                self._dropped += 1
+            except queue.Empty:
+                pass
+
+    def lines(self, heartbeat_sec: float) -> Iterator[Union[bytes, None]]:
+        # yields `None` every `heartbeat_sec` seconds of silence
+        while True:
+            try:
+                line = self._queue.get(timeout=heartbeat_sec)
+            except queue.Empty:
+                yield None
+                continue
+            if line is _END:
+                return
+            yield line
+
+    def close(self):
+        LogHubs.unsubscribe(self._hub, self)
+
+
+class ContainerLogHub(Thread):
+    """
+    Holds a single `follow` log stream to the engine for a container, keeps the most recent
+    lines in a ring buffer and fans them out to any number of subscribers.
+    The stream starts with a replay of the most recent lines (up to the size of the ring), the
+    replay only fills the ring: subscribers that join before it is over get the tail they asked
+    for once it is, and only then the live lines.
+    """
+
+    def __init__(self, container: DockerContainer, ring_size: int = LOGS_HUB_RING_LINES):
+        self._container = container
+        self._ring = deque(maxlen=ring_size)
+        self._subscribers = set()
+        # subscribers that joined during the replay, and the tail they asked for
+        self._waiting: Dict[LogSubscription, int] = {}
+        self._replayed = False
+        self._lock = Lock()
+        self._stream = None
+        self._closed = False
+        super(ContainerLogHub, self).__init__(target=self._work, daemon=True)
+
+    @property
+    def container_id(self) -> str:
+        return self._container.id
+
+    @property
+    def ring_size(self) -> int:
+        return self._ring.maxlen
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def add(self, tail: int) -> LogSubscription:
+        with self._lock:
+            if not self._replayed:
+                subscription = LogSubscription(self, [], max(LOGS_BUFFER_LINES, tail + 1))
+                self._waiting[subscription] = tail
+            else:
+                backlog = self._backlog(tail)
+                # the backlog alone never counts as dropped lines
+                subscription = LogSubscription(self, backlog,
+                                               max(LOGS_BUFFER_LINES, len(backlog) + 1))
+                if self._closed:
+                    subscription.offer(_END)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def remove(self, subscription: LogSubscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            self._waiting.pop(subscription, None)
+
+    def close(self):
+        self._closed = True
+        stream = self._stream
+        if stream is not None:
+            # noinspection PyBroadException
+            try:
+                stream.close()
+            except BaseException:
+                pass
+
+    def _work(self):
+        # noinspection PyBroadException
+        try:
+            # the engine does not mark the end of the replay, count the lines it will replay
+            replay = sum(1 for _ in split_lines([self._container.logs(tail=self._ring.maxlen)]))
+            self._stream = self._container.logs(stream=True, follow=True, tail=replay)
+            if self._closed:
+                self._stream.close()
+            with self._lock:
+                if replay <= 0:
+                    self._end_replay()
+            for line in split_lines(self._stream):
+                with self._lock:
+                    self._ring.append(line)
+                    if not self._replayed:
+                        replay -= 1
+                        if replay <= 0:
+                            self._end_replay()
+                        continue
+                    for subscription in self._subscribers:
+                        subscription.offer(line)
+        except BaseException:
+            pass
+        finally:
+            # the container stopped logging (or nobody is watching anymore)
+            with self._lock:
+                self._end_replay()
+                self._closed = True
+                for subscription in self._subscribers:
+                    subscription.offer(_END)
+            LogHubs.discard(self)
+
+    def _backlog(self, tail: int) -> List[bytes]:
+        return list(self._ring)[-tail:] if tail > 0 else []
+
+    def _end_replay(self):
+        # called with the lock held
+        if self._replayed:
+            return
+        self._replayed = True
+        for subscription, tail in self._waiting.items():
+            for line in self._backlog(tail):
+                subscription.offer(line)
+        self._waiting.clear()
+
+
+class LogHubRegistry(object):
+
+    def __init__(self):
+        self._hubs: Dict[str, ContainerLogHub] = {}
+        self._lock = Lock()
+
+    def subscribe(self, container: DockerContainer, tail: int) -> LogSubscription:
+        with self._lock:
+            hub = self._hubs.get(container.id, None)
+            if hub is None:
+                hub = ContainerLogHub(container)
+                self._hubs[container.id] = hub
+                hub.start()
+            return hub.add(tail)
+
+    def unsubscribe(self, hub: ContainerLogHub, subscription: LogSubscription):
+        with self._lock:
+            hub.remove(subscription)
+            if hub.subscribers > 0:
+                return
+            # nobody is watching, release the engine stream
+            if self._hubs.get(hub.container_id, None) is hub:
+                del self._hubs[hub.container_id]
+            hub.close()
+
+    def discard(self, hub: ContainerLogHub):
+        with self._lock:
+            if self._hubs.get(hub.container_id, None) is hub:
+                del self._hubs[hub.container_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {container_id: hub.subscribers for container_id, hub in self._hubs.items()}
+
+
+LogHubs = LogHubRegistry()
+
+__all__ = [
+    'LogHubs',
+    'LogSubscription'
+]
@@ -0,0 +1,103 @@
+import queue
+from threading import Thread
+from typing import Iterator, Union, Iterable
+
+from .constants import LOGS_MAX_LINE_BYTES, LOGS_BUFFER_LINES
+
+# marks the end of a log stream
+_END = object()
+
+
+def split_lines(chunks: Iterable[bytes], max_line: int = LOGS_MAX_LINE_BYTES) -> Iterator[bytes]:
+    # the engine sends chunks of arbitrary size, we only ever hold one (bounded) line in memory
+    buffer = b''
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line
+        if len(buffer) > max_line:
+            yield buffer
+            buffer = b''
+    if buffer:
+        yield buffer
+
+
+class LogReader(Thread):
+    """
+    Reads lines from a Docker log stream into a bounded queue, so that the consumer can
+    wake up periodically (e.g., to check whether its client is still there) even when
+    the container is not logging anything.
+    """
+
+    def __init__(self, stream, maxsize: int = LOGS_BUFFER_LINES):
+        self._stream = stream
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        super(LogReader, self).__init__(target=self._work, daemon=True)
+
+    def lines(self, heartbeat_sec: float) -> Iterator[Union[bytes, None]]:
+        # yields `None` every `heartbeat_sec` seconds of silence
+        while True:
+            try:
+                line = self._queue.get(timeout=heartbeat_sec)
+            except queue.Empty:
+                yield None
+                continue
+            if line is _END:
+                return
+            yield line
+
+    def close(self):
+        self._closed = True
+        # noinspection PyBroadException
+        try:
+            self._stream.close()
+        except BaseException:
+            pass
+
+    def _put(self, item):
+        # the consumer is slower than the container, wait (the engine waits with us)
+        while not self._closed:
+            try:
+                self._queue.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+
+    def _work(self):
+        # noinspection PyBroadException
+        try:
+            for line in split_lines(self._stream):
+                if self._closed:
+                    break
+                self._put(line)
+        except BaseException:
+            pass
+        finally:
+            self._put(_END)
+
+
+def format_line(line: bytes, fmt: str) -> bytes:
+    if fmt == 'sse':
+        # CR and LF would break the event
+        text = line.decode('utf-8', errors='replace').replace('\r', '')
+        return b'data: ' + text.encode('utf-8') + b'\n\n'
+    return line + b'\n'
+
+
+def keep_alive(fmt: str, text: bool = False) -> Union[bytes, None]:
+    # written during silences, writing is the only way to find out whether the client is gone
+    # (an empty chunk is not sent at all); text has no comments, its keep-alive is an empty
+    # line that clients cannot tell from a real one, so it is only sent when asked for
+    if fmt == 'sse':
+        return b': keep-alive\n\n'
+    return b'\n' if text else None
+
+
+__all__ = [
+    'LogReader',
+    'split_lines',
+    'format_line',
+    'keep_alive'
+]
@@ -2,7 +2,9 @@ import sys
 from dt_class_utils import DTProcess, AppStatus
 
 from code_api.api import CodeAPI
-from code_api.jobs import UpdateCheckerWorker
+from code_api.server import CodeAPIServer
+from code_api.jobs import UpdateCheckerWorker, ContainerMonitorWorker, PrefetchWorker, \
+    DockerEvents
 
 CODE_API_PORT = 8086
 
@@ -12,14 +14,23 @@ class CodeAPIApp(DTProcess):
     def __init__(self):
         super(CodeAPIApp, self).__init__('CodeAPI')
         self._api = CodeAPI(debug=self.is_debug)
+        self._server = CodeAPIServer(self._api, host='0.0.0.0', port=CODE_API_PORT)
         self.status = AppStatus.RUNNING
         self._updates_checker = UpdateCheckerWorker()
-        # register shutdown callback
+        self._containers_monitor = ContainerMonitorWorker()
+        self._prefetcher = PrefetchWorker()
+        # register shutdown callback (this also stops the HTTP server)
         self.register_shutdown_callback(_kill)
-        # launch updates checker thread
+        # schedule the updates checker
         self._updates_checker.start()
+        # schedule the containers monitor
+        self._containers_monitor.start()
+        # schedule the prefetching of pending updates (if enabled)
+        self._prefetcher.start()
+        # follow the Docker events (all subscribers are registered by now)
+        DockerEvents.start()
         # serve HTTP requests over the REST API
-        self._api.run(host='0.0.0.0', port=CODE_API_PORT)
+        self._server.serve_forever()
 
 
 def _kill():
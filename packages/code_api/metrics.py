@@ -0,0 +1,284 @@
+import re
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# latency buckets (seconds)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _Metric(object):
+    """
+    Base class of the metrics exposed in the Prometheus text format. A metric has one value
+    per combination of label values, created on first use. Updating a value only costs a
+    dictionary lookup and a (per-value) lock.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = Lock()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        value = self._values.get(values, None)
+        if value is None:
+            with self._lock:
+                value = self._values.setdefault(values, self._new_value())
+        return value
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for values, value in list(self._values.items()):
+            labels = dict(zip(self.label_names, values))
+            yield from value.samples(self.name, labels)
+
+    def _new_value(self):
+        raise NotImplementedError()
+
+
+class _CounterValue(object):
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name: str, labels: dict):
+        yield name, labels, self._value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _new_value(self):
+        return _CounterValue()
+
+
+class _HistogramValue(object):
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def time(self) -> '_Timer':
+        return _Timer(self)
+
+    def samples(self, name: str, labels: dict):
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float('inf'),), counts):
+            cumulative += count
+            yield f'{name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+        yield f'{name}_sum', labels, total
+        yield f'{name}_count', labels, cumulative
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labels)
+        self._buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _new_value(self):
+        return _HistogramValue(self._buckets)
+
+
+class Gauge(_Metric):
+    """
+    Gauges are computed when the metrics are collected (the function returns the value, or a
+    map from label values to values when the gauge has labels).
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, function: Callable,
+                 labels: Tuple[str, ...] = ()):
+        super(Gauge, self).__init__(name, documentation, labels)
+        self._function = function
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        # noinspection PyBroadException
+        try:
+            value = self._function()
+        except BaseException:
+            return
+        if not self.label_names:
+            yield self.name, {}, value
+            return
+        for values, v in value.items():
+            values = values if isinstance(values, tuple) else (values,)
+            yield self.name, dict(zip(self.label_names, map(str, values))), v
+
+    def labels(self, *values):
+        # there is nothing to update, the values come from the function
+        raise TypeError(f"Gauge '{self.name}' has no values to update, they are computed by its "
+                        f"function when the metrics are collected")
+
+
+class _Timer(object):
+
+    def __init__(self, histogram: _HistogramValue):
+        self._histogram = histogram
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class MetricsRegistry(object):
+
+    def __init__(self, prefix: str = 'code_api'):
+        self._prefix = prefix
+        self._metrics: List[_Metric] = []
+        self._lock = Lock()
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(f'{self._prefix}_{name}_total', documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(
+            Histogram(f'{self._prefix}_{name}', documentation, labels, buckets)
+        )
+
+    def gauge(self, name: str, documentation: str, function: Callable,
+              labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(f'{self._prefix}_{name}', documentation, function, labels))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def docker_endpoint(path: str) -> str:
+    # keeps the cardinality low, e.g., `/v1.41/containers/<id>/start` -> `containers/{id}/start`,
+    # anything that is not a known action is an ID or a name (which might contain slashes)
+    segments = [s for s in re.sub(r'^/v[0-9.]+', '', path.split('?')[0]).split('/') if s]
+    if len(segments) <= 1:
+        return '/'.join(segments)
+    resource, rest = segments[0], segments[1:]
+    if len(rest) == 1 and rest[0] in _DOCKER_COLLECTION_ACTIONS:
+        # e.g., `GET /containers/json`
+        return f'{resource}/{rest[0]}'
+    if len(rest) > 1 and rest[-1] in _DOCKER_ITEM_ACTIONS:
+        # e.g., `POST /images/duckietown/dt-core:daffy/tag`
+        return f'{resource}/{{id}}/{rest[-1]}'
+    # e.g., `DELETE /containers/<id>`
+    return f'{resource}/{{id}}'
+
+
+_DOCKER_COLLECTION_ACTIONS = {'json', 'create', 'prune', 'search', 'load', 'get', 'build'}
+_DOCKER_ITEM_ACTIONS = {
+    'json', 'start', 'stop', 'restart', 'kill', 'pause', 'unpause', 'wait', 'logs', 'top',
+    'stats', 'changes', 'export', 'resize', 'attach', 'exec', 'rename', 'update', 'archive',
+    'history', 'push', 'tag', 'get', 'connect', 'disconnect', 'enable', 'disable', 'upgrade',
+    'set', 'privileges'
+}
+
+
+Metrics = MetricsRegistry()
+
+# REST API
+HTTP_REQUESTS = Metrics.counter(
+    'http_requests', 'Requests served by the REST API.', ('method', 'endpoint', 'status'))
+HTTP_LATENCY = Metrics.histogram(
+    'http_request_duration_seconds', 'Time spent serving requests (streaming responses stop '
+    'counting when the stream starts).', ('endpoint',))
+# Docker engine
+DOCKER_REQUESTS = Metrics.counter(
+    'docker_requests', 'Requests made to the Docker engine.', ('method', 'endpoint', 'status'))
+DOCKER_LATENCY = Metrics.histogram(
+    'docker_request_duration_seconds', 'Time until the Docker engine answered (headers).',
+    ('endpoint',))
+# registry
+REGISTRY_REQUESTS = Metrics.counter(
+    'registry_requests', 'Requests made to the registry.', ('kind', 'status'))
+REGISTRY_LATENCY = Metrics.histogram(
+    'registry_request_duration_seconds', 'Time spent on requests to the registry.', ('kind',))
+# jobs
+JOB_STEPS = Metrics.counter(
+    'job_steps', 'Steps run by the jobs.', ('job', 'result'))
+JOB_STEP_LATENCY = Metrics.histogram(
+    'job_step_duration_seconds', 'Time spent in the steps of the jobs.', ('job',),
+    buckets=DEFAULT_BUCKETS + (120, 300, 600, 1800))
+# pulls
+PULL_BYTES = Metrics.counter(
+    'pull_bytes', 'Bytes downloaded while pulling images.', ('module',))
+PULL_LATENCY = Metrics.histogram(
+    'pull_duration_seconds', 'Time spent pulling images.', ('module',),
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600))
+
+__all__ = [
+    'Metrics',
+    'MetricsRegistry',
+    'Counter',
+    'Histogram',
+    'Gauge',
+    'docker_endpoint',
+    'HTTP_REQUESTS',
+    'HTTP_LATENCY',
+    'DOCKER_REQUESTS',
+    'DOCKER_LATENCY',
+    'REGISTRY_REQUESTS',
+    'REGISTRY_LATENCY',
+    'JOB_STEPS',
+    'JOB_STEP_LATENCY',
+    'PULL_BYTES',
+    'PULL_LATENCY'
+]
@@ -0,0 +1,230 @@
+import io
+import os
+import sys
+import time
+import marshal
+import pstats
+import threading
+import tracemalloc
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Set, Tuple, Union
+
+# (filename, first line, function), the way cProfile/pstats identify functions
+FunctionKey = Tuple[str, int, str]
+
+# innermost frames of threads that are waiting for something to do (e.g., the idle workers of a
+# pool), they would fill the profile with time nobody spent
+_IDLE_LEAVES = [(os.sep + file, function) for file, function in [
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    (os.path.join('concurrent', 'futures', 'thread.py'), '_worker'),
+    (os.path.join('waitress', 'wasyncore.py'), 'poll'),
+]]
+
+
+class StackSamples(object):
+    """
+    Stacks of all the threads of the process sampled at regular intervals. Unlike cProfile,
+    sampling does not need to be installed in a thread before it starts, so the pool threads of
+    the jobs and the server are seen too, and the threads being sampled pay (almost) nothing.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = 0
+        self.duration = 0.0
+        # stacks left out because the thread was waiting (see `_IDLE_LEAVES`)
+        self.idle = 0
+        # thread name and frames (outermost first) -> number of times it was seen
+        self.stacks: Dict[Tuple[str, Tuple[FunctionKey, ...]], int] = Counter()
+
+    @property
+    def period(self) -> float:
+        # actual time between samples, busy threads holding the GIL make it longer than asked
+        return self.duration / self.samples if self.samples > 0 else self.interval
+
+    def collapsed(self) -> str:
+        # one line per stack, the input format of flamegraph.pl, speedscope, etc.
+        lines = []
+        for (thread, frames), count in sorted(self.stacks.items(), key=lambda s: -s[1]):
+            names = [thread] + [f'{name} ({os.path.basename(file)}:{line})'
+                                for file, line, name in frames]
+            lines.append(f"{';'.join(n.replace(';', ':') for n in names)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def create_stats(self):
+        # sample counts become times, this makes the object loadable by `pstats.Stats`
+        self.stats = {}
+        period = self.period
+        for (_, frames), count in self.stacks.items():
+            seconds = count * period
+            seen: Set[FunctionKey] = set()
+            for i, function in enumerate(frames):
+                caller = frames[i - 1] if i > 0 else None
+                nc, cc, tt, ct, callers = self.stats.get(function, (0, 0, 0.0, 0.0, {}))
+                leaf = i == len(frames) - 1
+                # recursive functions count once per stack in the cumulative time
+                cumulative = function not in seen
+                seen.add(function)
+                if caller is not None:
+                    c_nc, c_cc, c_tt, c_ct = callers.get(caller, (0, 0, 0.0, 0.0))
+                    callers[caller] = (c_nc + count, c_cc + count,
+                                       c_tt + (seconds if leaf else 0.0), c_ct + seconds)
+                self.stats[function] = (
+                    nc + count, cc + (count if cumulative else 0),
+                    tt + (seconds if leaf else 0.0), ct + (seconds if cumulative else 0.0),
+                    callers
+                )
+
+    def to_pstats(self) -> bytes:
+        # same format as `cProfile.Profile.dump_stats`, i.e., `pstats.Stats(<file>)` loads it
+        self.create_stats()
+        return marshal.dumps(self.stats)
+
+    def text(self, sort: str = 'cumulative', limit: int = 50) -> str:
+        if not self.stacks:
+            # pstats refuses empty profiles
+            return 'No samples.\n'
+        stream = io.StringIO()
+        stats = pstats.Stats(self, stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+class SamplingProfiler(object):
+
+    def __init__(self):
+        # one capture at a time, two samplers would only slow each other down
+        self._lock = Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def capture(self, seconds: float, interval: float, idle: bool = False) -> \
+            Union[StackSamples, None]:
+        # blocks the calling thread (which is not sampled) for the given time
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            return self._capture(seconds, interval, idle)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _capture(seconds: float, interval: float, idle: bool) -> StackSamples:
+        me = threading.get_ident()
+        out = StackSamples(interval)
+        names: Dict[int, str] = {}
+        start = time.perf_counter()
+        end = start + seconds
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            frames = sys._current_frames()
+            # threads come and go (e.g., the recreate pools), refresh their names when we meet one
+            if not frames.keys() <= names.keys():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack: List[FunctionKey] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                if not idle and stack and _is_idle(stack[0]):
+                    out.idle += 1
+                    continue
+                out.stacks[(names.get(ident, str(ident)), tuple(reversed(stack)))] += 1
+            del frames
+            out.samples += 1
+            # keep the rate, the time spent walking the stacks is part of the interval
+            time.sleep(max(0.0, interval - (time.perf_counter() - now)))
+        out.duration = time.perf_counter() - start
+        return out
+
+
+def _is_idle(leaf: FunctionKey) -> bool:
+    file, _, function = leaf
+    return any(function == f and file.endswith(suffix) for suffix, f in _IDLE_LEAVES)
+
+
+class MemoryTracer(object):
+    """
+    Wraps tracemalloc. Tracing slows down every allocation, so it only runs between `start`
+    and `stop`, `diff` compares the allocations with those at `start` (or at the last reset).
+    """
+
+    def __init__(self):
+        self._baseline = None
+        self._started = None
+        self._lock = Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> bool:
+        with self._lock:
+            if tracemalloc.is_tracing():
+                return False
+            tracemalloc.start(frames)
+            self._started = time.time()
+            self._baseline = self._snapshot()
+            return True
+
+    def stop(self) -> bool:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                return False
+            tracemalloc.stop()
+            self._baseline = self._started = None
+            return True
+
+    def diff(self, key: str = 'lineno', limit: int = 25, reset: bool = False) -> \
+            Union[dict, None]:
+        with self._lock:
+            if not tracemalloc.is_tracing() or self._baseline is None:
+                return None
+            snapshot = self._snapshot()
+            stats = snapshot.compare_to(self._baseline, key)
+            if reset:
+                self._baseline = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'since': self._started,
+            'traced': {'current': current, 'peak': peak},
+            'growth': sum(s.size_diff for s in stats),
+            'top': [{
+                'traceback': [f'{frame.filename}:{frame.lineno}' for frame in s.traceback],
+                'size': s.size,
+                'size_diff': s.size_diff,
+                'count': s.count,
+                'count_diff': s.count_diff
+            } for s in stats[:limit]]
+        }
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+
+Profiler = SamplingProfiler()
+Memory = MemoryTracer()
+
+__all__ = [
+    'Profiler',
+    'Memory',
+    'SamplingProfiler',
+    'MemoryTracer',
+    'StackSamples'
+]
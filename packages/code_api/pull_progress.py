@@ -0,0 +1,127 @@
+import time
+from threading import Lock
+from typing import Dict, Union
+
+# share of the progress given to the download (the rest goes to the extraction)
+DOWNLOAD_WEIGHT = 0.8
+# smoothing factor of the throughput and minimum time between two samples
+THROUGHPUT_ALPHA = 0.3
+THROUGHPUT_SAMPLE_SEC = 0.5
+
+
+class PullProgress(object):
+    """
+    Byte-level progress of an image pull, fed with the JSON messages of the engine's pull
+    stream. Layer sizes are known upfront when the manifest is (so the total does not grow as
+    new layers show up), layers that already exist on disk are taken out of the total.
+    """
+
+    def __init__(self, layers: Dict[str, int] = None):
+        # the engine refers to layers with the first 12 hex digits of their digest
+        self._total: Dict[str, int] = {
+            digest.split(':')[-1][:12]: size for digest, size in (layers or {}).items()
+        }
+        self._downloaded: Dict[str, int] = {}
+        self._extracted: Dict[str, int] = {}
+        self._lock = Lock()
+        self._started = time.time()
+        self._finished = None
+        self._throughput = 0.0
+        self._last_sample = (self._started, 0)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._total.values())
+
+    @property
+    def downloaded_bytes(self) -> int:
+        return sum(self._downloaded.values())
+
+    @property
+    def remaining_bytes(self) -> int:
+        return max(0, self.total_bytes - self.downloaded_bytes)
+
+    @property
+    def throughput(self) -> float:
+        # bytes per second
+        return self._throughput
+
+    @property
+    def eta(self) -> Union[float, None]:
+        if self._finished is not None:
+            return 0.0
+        if self._throughput <= 0:
+            return None
+        return self.remaining_bytes / self._throughput
+
+    @property
+    def duration(self) -> float:
+        return (self._finished or time.time()) - self._started
+
+    @property
+    def fraction(self) -> float:
+        total = self.total_bytes
+        if total <= 0:
+            return 1.0 if self._finished is not None else 0.0
+        extracted = sum(self._extracted.values())
+        return min(1.0, (
+            DOWNLOAD_WEIGHT * self.downloaded_bytes + (1 - DOWNLOAD_WEIGHT) * extracted
+        ) / total)
+
+    def update(self, message: dict):
+        layer = message.get('id', None)
+        status = message.get('status', '')
+        if layer is None:
+            return
+        detail = message.get('progressDetail', None) or {}
+        with self._lock:
+            if status == 'Already exists':
+                # nothing to download
+                self._total.pop(layer, None)
+                self._downloaded.pop(layer, None)
+                self._extracted.pop(layer, None)
+            elif status == 'Downloading' and 'current' in detail:
+                if detail.get('total', 0) > 0:
+                    self._total[layer] = detail['total']
+                self._downloaded[layer] = detail['current']
+            elif status in ['Verifying Checksum', 'Download complete']:
+                self._downloaded[layer] = self._total.get(layer, 0)
+            elif status == 'Extracting' and 'current' in detail:
+                self._downloaded[layer] = self._total.get(layer, 0)
+                self._extracted[layer] = min(detail['current'], self._total.get(layer, 0))
+            elif status == 'Pull complete':
+                self._downloaded[layer] = self._extracted[layer] = self._total.get(layer, 0)
+            else:
+                return
+            self._sample()
+
+    def finish(self):
+        self._finished = time.time()
+
+    def summary(self) -> dict:
+        return {
+            'bytes': {
+                'total': self.total_bytes,
+                'downloaded': self.downloaded_bytes,
+                'remaining': self.remaining_bytes
+            },
+            'throughput': round(self._throughput, 1),
+            'eta': round(self.eta, 1) if self.eta is not None else None,
+            'duration': round(self.duration, 1)
+        }
+
+    def _sample(self):
+        now = time.time()
+        last_time, last_bytes = self._last_sample
+        if now - last_time < THROUGHPUT_SAMPLE_SEC:
+            return
+        downloaded = self.downloaded_bytes
+        rate = max(0, downloaded - last_bytes) / (now - last_time)
+        self._throughput = rate if self._throughput <= 0 else \
+            THROUGHPUT_ALPHA * rate + (1 - THROUGHPUT_ALPHA) * self._throughput
+        self._last_sample = (now, downloaded)
+
+
+__all__ = [
+    'PullProgress'
+]
@@ -0,0 +1,189 @@
+import json
+import time
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .constants import DOCKER_HUB_API_URL, REGISTRY_POOL_SIZE, REGISTRY_TIMEOUT_SEC
+from .metrics import REGISTRY_REQUESTS, REGISTRY_LATENCY
+from .registry_cache import RegistryCache, compute_digest
+
+# tokens are renewed a little before they actually expire
+TOKEN_EXPIRATION_MARGIN_SEC = 10
+# DockerHub does not always tell us how long a token lasts, its default is 5 minutes
+TOKEN_DEFAULT_DURATION_SEC = 300
+# DockerHub counts pulls over a 6 hours window when the headers do not tell
+RATE_LIMIT_DEFAULT_WINDOW_SEC = 21600
+
+MANIFEST_V2 = "application/vnd.docker.distribution.manifest.v2+json"
+# the engine stores the digest of whatever the tag points to (single manifest or manifest list)
+MANIFEST_ANY = ", ".join([
+    MANIFEST_V2,
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.oci.image.index.v1+json"
+])
+
+
+class RegistryClient(object):
+    """
+    Talks to the DockerHub registry API over a pooled (keep-alive) HTTP session.
+    Bearer tokens are cached per repository scope until they expire, manifests and image
+    configurations are cached on disk by digest.
+    """
+
+    def __init__(self, pool_size: int = REGISTRY_POOL_SIZE, timeout: float = REGISTRY_TIMEOUT_SEC,
+                 cache: RegistryCache = None):
+        self._timeout = timeout
+        self._cache = cache if cache is not None else RegistryCache()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._tokens = {}
+        self._tokens_lock = Lock()
+        self._stats = defaultdict(int)
+        self._stats_lock = Lock()
+        self._rate_limit = {}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    @property
+    def rate_limit(self) -> dict:
+        # last values of the RateLimit-* headers seen (empty if the registry never sent them)
+        return dict(self._rate_limit)
+
+    def has_budget(self) -> bool:
+        # a reading is only good for the window it was given for, the counter resets after that
+        rate_limit = self._rate_limit
+        remaining = rate_limit.get('remaining', None)
+        if remaining is None or remaining > 0:
+            return True
+        window = rate_limit.get('window_sec', RATE_LIMIT_DEFAULT_WINDOW_SEC)
+        return time.time() > rate_limit['updated'] + window
+
+    def token(self, image: str) -> str:
+        with self._tokens_lock:
+            token, expires_at = self._tokens.get(image, (None, 0))
+        if token is not None and time.time() < expires_at:
+            self._count('token_cache_hit')
+            return token
+        # ask for a new token
+        res = self._get(DOCKER_HUB_API_URL['token'].format(image=image), 'token').json()
+        token = res['token']
+        duration = int(res.get('expires_in', TOKEN_DEFAULT_DURATION_SEC))
+        with self._tokens_lock:
+            self._tokens[image] = (token, time.time() + duration - TOKEN_EXPIRATION_MARGIN_SEC)
+        return token
+
+    def manifest(self, image: str, tag: str) -> dict:
+        url = DOCKER_HUB_API_URL['digest'].format(image=image, tag=tag)
+        headers = {"Accept": MANIFEST_V2}
+        # revalidate the manifest we have seen last (if we still have it)
+        etag, digest = self._cache.get_tag(image, tag)
+        cached = self._cache.get_blob(digest) if digest is not None else None
+        if etag is not None and cached is not None:
+            headers["If-None-Match"] = etag
+        res = self._authorized_get(url, 'manifest', image, headers)
+        if res.status_code == 304:
+            self._count('manifest_not_modified')
+            return json.loads(cached)
+        # store the new manifest
+        digest = res.headers.get('Docker-Content-Digest', None) or compute_digest(res.content)
+        self._cache.put_blob(digest, res.content)
+        self._cache.put_tag(image, tag, res.headers.get('ETag', None), digest)
+        return res.json()
+
+    def cached_manifest(self, digest: str) -> Union[dict, None]:
+        # a manifest we fetched before, without asking the registry
+        cached = self._cache.get_blob(digest)
+        return json.loads(cached) if cached is not None else None
+
+    def manifest_digest(self, image: str, tag: str) -> Union[str, None]:
+        url = DOCKER_HUB_API_URL['digest'].format(image=image, tag=tag)
+        headers = {"Accept": MANIFEST_ANY}
+        res = self._authorized_request('HEAD', url, 'manifest_head', image, headers)
+        return res.headers.get('Docker-Content-Digest', None)
+
+    def blob(self, image: str, digest: str) -> dict:
+        # blobs are immutable, once we have them we never ask again
+        cached = self._cache.get_blob(digest)
+        if cached is not None:
+            self._count('blob_cache_hit')
+            return json.loads(cached)
+        url = DOCKER_HUB_API_URL['inspect'].format(image=image, digest=digest)
+        res = self._authorized_get(url, 'blob', image, {})
+        if compute_digest(res.content) == digest:
+            self._cache.put_blob(digest, res.content)
+        return res.json()
+
+    def inspect(self, image: str, tag: str) -> dict:
+        digest = self.manifest(image, tag)['config']['digest']
+        return self.blob(image, digest)
+
+    def _authorized_get(self, url: str, kind: str, image: str, headers: dict) -> requests.Response:
+        return self._authorized_request('GET', url, kind, image, headers)
+
+    def _authorized_request(self, method: str, url: str, kind: str, image: str,
+                            headers: dict) -> requests.Response:
+        try:
+            return self._request(method, url, kind, headers={
+                **headers, "Authorization": "Bearer {0}".format(self.token(image))
+            })
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 401:
+                raise
+        # the cached token was rejected, forget it and try again (once)
+        with self._tokens_lock:
+            self._tokens.pop(image, None)
+        return self._request(method, url, kind, headers={
+            **headers, "Authorization": "Bearer {0}".format(self.token(image))
+        })
+
+    def _get(self, url: str, kind: str, **kwargs) -> requests.Response:
+        return self._request('GET', url, kind, **kwargs)
+
+    def _request(self, method: str, url: str, kind: str, **kwargs) -> requests.Response:
+        self._count(kind)
+        try:
+            with REGISTRY_LATENCY.labels(kind).time():
+                res = self._session.request(method, url, timeout=self._timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            REGISTRY_REQUESTS.labels(kind, 'error').inc()
+            raise
+        REGISTRY_REQUESTS.labels(kind, res.status_code).inc()
+        self._update_rate_limit(res)
+        res.raise_for_status()
+        return res
+
+    def _update_rate_limit(self, res: requests.Response):
+        # e.g., RateLimit-Remaining: 76;w=21600
+        if 'RateLimit-Remaining' not in res.headers:
+            return
+        rate_limit = {'updated': time.time()}
+        for key, header in [('limit', 'RateLimit-Limit'), ('remaining', 'RateLimit-Remaining')]:
+            value, _, window = res.headers.get(header, '').partition(';w=')
+            try:
+                rate_limit[key] = int(value)
+                rate_limit['window_sec'] = int(window)
+            except ValueError:
+                pass
+        self._rate_limit = rate_limit
+
+    def _count(self, kind: str):
+        with self._stats_lock:
+            self._stats[kind] += 1
+
+
+Registry = RegistryClient()
+
+__all__ = [
+    'RegistryClient',
+    'Registry'
+]
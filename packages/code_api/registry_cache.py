@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from threading import Lock
+from typing import Union, Tuple, Dict
+
+from .constants import REGISTRY_CACHE_DIR, REGISTRY_CACHE_MAX_MB
+from .files import atomic_write
+
+
+class RegistryCache(object):
+    """
+    Persistent cache of registry objects (manifests, image configurations).
+
+    Objects are immutable and stored by digest; the least recently used ones are evicted
+    when the cache grows bigger than `max_bytes`. Tags are mutable, for each tag we only
+    remember the ETag and digest of the last manifest seen so that it can be revalidated.
+    """
+
+    def __init__(self, root: str = REGISTRY_CACHE_DIR,
+                 max_bytes: int = REGISTRY_CACHE_MAX_MB * 2 ** 20):
+        self._root = root
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+        self._logger = logging.getLogger('CodeAPI:RegistryCache')
+        # digest -> (size, last access time)
+        self._blobs: Dict[str, Tuple[int, float]] = {}
+        self._size = 0
+        self._enabled = self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get_blob(self, digest: str) -> Union[bytes, None]:
+        if not self._enabled:
+            return None
+        with self._lock:
+            if digest not in self._blobs:
+                return None
+            path = self._blob_path(digest)
+            try:
+                with open(path, 'rb') as fin:
+                    data = fin.read()
+                os.utime(path)
+            except OSError:
+                self._forget(digest)
+                return None
+            self._blobs[digest] = (len(data), time.time())
+            return data
+
+    def put_blob(self, digest: str, data: bytes):
+        if not self._enabled or len(data) > self._max_bytes:
+            return
+        with self._lock:
+            if digest in self._blobs:
+                return
+            try:
+                atomic_write(self._blob_path(digest), data)
+            except OSError as e:
+                self._logger.warning(f'Could not write to the registry cache: {str(e)}')
+                return
+            self._blobs[digest] = (len(data), time.time())
+            self._size += len(data)
+            self._evict()
+
+    def get_tag(self, image: str, tag: str) -> Tuple[Union[str, None], Union[str, None]]:
+        if not self._enabled:
+            return None, None
+        # noinspection PyBroadException
+        try:
+            with open(self._tag_path(image, tag), 'rt') as fin:
+                entry = json.load(fin)
+            return entry['etag'], entry['digest']
+        except BaseException:
+            return None, None
+
+    def put_tag(self, image: str, tag: str, etag: Union[str, None], digest: str):
+        if not self._enabled:
+            return
+        entry = {'image': image, 'tag': tag, 'etag': etag, 'digest': digest}
+        try:
+            atomic_write(self._tag_path(image, tag), json.dumps(entry).encode('utf-8'))
+        except OSError as e:
+            self._logger.warning(f'Could not write to the registry cache: {str(e)}')
+
+    def _load(self) -> bool:
+        try:
+            os.makedirs(os.path.join(self._root, 'blobs'), exist_ok=True)
+            os.makedirs(os.path.join(self._root, 'tags'), exist_ok=True)
+            for fname in os.listdir(os.path.join(self._root, 'blobs')):
+                if '.tmp.' in fname:
+                    continue
+                stat = os.stat(os.path.join(self._root, 'blobs', fname))
+                digest = fname.replace('_', ':', 1)
+                self._blobs[digest] = (stat.st_size, stat.st_mtime)
+                self._size += stat.st_size
+        except OSError as e:
+            self._logger.warning(f'Registry cache disabled, the directory {self._root} '
+                                 f'is not usable: {str(e)}')
+            return False
+        self._evict()
+        return True
+
+    def _evict(self):
+        if self._size <= self._max_bytes:
+            return
+        for digest, _ in sorted(self._blobs.items(), key=lambda kv: kv[1][1]):
+            if self._size <= self._max_bytes:
+                break
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+            self._forget(digest)
+
+    def _forget(self, digest: str):
+        size, _ = self._blobs.pop(digest, (0, 0))
+        self._size -= size
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._root, 'blobs', digest.replace(':', '_', 1))
+
+    def _tag_path(self, image: str, tag: str) -> str:
+        key = hashlib.sha256(f'{image}:{tag}'.encode('utf-8')).hexdigest()
+        return os.path.join(self._root, 'tags', f'{key}.json')
+
+
+def compute_digest(data: bytes) -> str:
+    return 'sha256:' + hashlib.sha256(data).hexdigest()
+
+
+__all__ = [
+    'RegistryCache',
+    'compute_digest'
+]
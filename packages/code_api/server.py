@@ -0,0 +1,69 @@
+import logging
+
+from flask import Flask
+
+from .constants import HTTP_SERVER, HTTP_THREADS, HTTP_MAX_STREAMS, HTTP_CONNECTION_LIMIT, \
+    HTTP_BACKLOG, HTTP_CHANNEL_TIMEOUT_SEC
+
+SUPPORTED_SERVERS = ['waitress', 'werkzeug']
+
+
+class CodeAPIServer(object):
+    """
+    Serves a Flask application either with `waitress` (production, default) or with the
+    Werkzeug development server.
+    The waitress server uses a fixed pool of worker threads, HTTP/1.1 keep-alive, a cap on the
+    number of open connections and closes the connections that stay idle for too long.
+    Long-lived responses hold a worker thread each, the pool has room for `HTTP_MAX_STREAMS` of
+    them on top of the `HTTP_THREADS` left to the other requests (see `StreamSlots`).
+
+    NOTE: the server stops when the main thread receives `SystemExit` (i.e., when DTProcess
+          runs the shutdown callbacks), waitress then waits (for up to 5 seconds) for the
+          worker threads to complete the requests in flight.
+    """
+
+    def __init__(self, app: Flask, host: str, port: int, server: str = HTTP_SERVER):
+        if server not in SUPPORTED_SERVERS:
+            raise ValueError("Invalid HTTP server '{}'. Valid choices are {}".format(
+                server, ', '.join(SUPPORTED_SERVERS)
+            ))
+        self._app = app
+        self._host = host
+        self._port = port
+        self._kind = server
+        self._server = None
+        self._logger = logging.getLogger('CodeAPI:HTTP')
+
+    @property
+    def kind(self) -> str:
+        return self._kind
+
+    def serve_forever(self):
+        if self._kind == 'werkzeug':
+            self._app.run(host=self._host, port=self._port, threaded=True)
+            return
+        # noinspection PyPackageRequirements
+        from waitress import create_server
+        threads = HTTP_THREADS + HTTP_MAX_STREAMS
+        self._server = create_server(
+            self._app,
+            host=self._host,
+            port=self._port,
+            threads=threads,
+            connection_limit=HTTP_CONNECTION_LIMIT,
+            backlog=HTTP_BACKLOG,
+            channel_timeout=HTTP_CHANNEL_TIMEOUT_SEC,
+            ident='CodeAPI'
+        )
+        self._logger.info(f'Serving on http://{self._host}:{self._port} '
+                          f'with {threads} threads ({HTTP_MAX_STREAMS} for streams)')
+        try:
+            self._server.run()
+        finally:
+            # stop accepting new connections
+            self._server.close()
+
+
+__all__ = [
+    'CodeAPIServer'
+]
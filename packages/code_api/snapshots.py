@@ -0,0 +1,83 @@
+import os
+import json
+import logging
+from threading import Lock
+from typing import Dict, Union
+
+from .constants import MODULES_SNAPSHOT_DIR
+from .files import atomic_write
+
+
+class ModuleSnapshotStore(object):
+    """
+    Keeps the last known state of each module on disk (one file per module) so that it
+    can be restored right after a restart. A file is only rewritten when its content changes.
+    """
+
+    def __init__(self, root: str = MODULES_SNAPSHOT_DIR):
+        self._root = root
+        self._lock = Lock()
+        self._logger = logging.getLogger('CodeAPI:Snapshots')
+        # what is currently on disk
+        self._written: Dict[str, dict] = {}
+        self._enabled = self._setup()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def load(self, name: str) -> Union[dict, None]:
+        if not self._enabled:
+            return None
+        # noinspection PyBroadException
+        try:
+            with open(self._path(name), 'rt') as fin:
+                snapshot = json.load(fin)
+        except BaseException:
+            return None
+        with self._lock:
+            self._written[name] = snapshot
+        return snapshot
+
+    def save(self, name: str, snapshot: dict):
+        if not self._enabled:
+            return
+        with self._lock:
+            if self._written.get(name, None) == snapshot:
+                return
+            try:
+                atomic_write(self._path(name), json.dumps(snapshot, sort_keys=True).encode('utf-8'))
+            except (OSError, TypeError, ValueError) as e:
+                self._logger.warning(f'Could not save the snapshot of module {name}: {str(e)}')
+                return
+            self._written[name] = snapshot
+
+    def remove(self, name: str):
+        if not self._enabled:
+            return
+        with self._lock:
+            self._written.pop(name, None)
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def _setup(self) -> bool:
+        try:
+            os.makedirs(self._root, exist_ok=True)
+        except OSError as e:
+            self._logger.warning(f'Module snapshots disabled, the directory {self._root} '
+                                 f'is not usable: {str(e)}')
+            return False
+        return True
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._root, '{}.json'.format(name.replace('/', '_')))
+
+
+ModuleSnapshots = ModuleSnapshotStore()
+
+__all__ = [
+    'ModuleSnapshotStore',
+    'ModuleSnapshots'
+]
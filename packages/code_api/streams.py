@@ -0,0 +1,40 @@
+from threading import Lock
+
+from .constants import HTTP_MAX_STREAMS
+
+
+class StreamSlots(object):
+    """
+    Long-lived responses (event streams, log follows, long-polls) hold a worker thread of the
+    HTTP server for their whole life. They get their own share of the worker threads (the
+    server runs `HTTP_THREADS + HTTP_MAX_STREAMS` of them) and at most `limit` run at the same
+    time, so that they can never starve the REST API.
+    """
+
+    def __init__(self, limit: int = HTTP_MAX_STREAMS):
+        self.limit = limit
+        self._active = 0
+        self._lock = Lock()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self._active >= self.limit:
+                return False
+            self._active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active = max(0, self._active - 1)
+
+
+Streams = StreamSlots()
+
+__all__ = [
+    'Streams',
+    'StreamSlots'
+]
@@ -1,20 +1,21 @@
 import os
-import json
 import docker
-import requests
 from flask import jsonify
 from datetime import datetime
 
 from docker.models.containers import Container as DockerContainer
 
-from .constants import CANONICAL_ARCH, DOCKER_LABEL_DOMAIN, DOCKER_HUB_API_URL, DT_LAUNCHER_PREFIX
+from .docker_client import DockerClients
+from .registry import Registry
+from .constants import CANONICAL_ARCH, DOCKER_LABEL_DOMAIN, DT_LAUNCHER_PREFIX
 
 
-def response_ok(data, *args, **kwargs):
+def response_ok(data, *args, meta: dict = None, **kwargs):
     return jsonify({
         'status': 'ok',
         'message': None,
-        'data': data
+        'data': data,
+        **({'meta': meta} if meta is not None else {})
     })
 
 
@@ -34,6 +35,14 @@ def response_need_force(message, *args, **kwargs):
     })
 
 
+def response_busy(message, retry_after: int = 5, *args, **kwargs):
+    return jsonify({
+        'status': 'error',
+        'message': message,
+        'data': None
+    }), 503, {'Retry-After': str(retry_after)}
+
+
 def response_not_implemented(action, *args, **kwargs):
     return jsonify({
         'status': 'not-implemented',
@@ -52,9 +61,9 @@ def response_not_found(action=None, *args, **kwargs):
     return response_error(msg)
 
 
-def get_client():
-    base_url = os.environ.get('TARGET_ENDPOINT', 'unix:///var/run/docker.sock')
-    return docker.DockerClient(base_url=base_url)
+def get_client() -> docker.DockerClient:
+    # the client is shared by all threads, do not close it
+    return DockerClients.get()
 
 
 def get_endpoint_architecture():
@@ -81,28 +90,17 @@ def dt_launcher(name):
     return f'{DT_LAUNCHER_PREFIX}{name}'
 
 
+def get_registry(image) -> str:
+    # images without an explicit registry host live on DockerHub
+    parts = image.split('/')
+    if len(parts) > 1 and ('.' in parts[0] or ':' in parts[0] or parts[0] == 'localhost'):
+        return parts[0]
+    return 'docker.io'
+
+
 def inspect_remote_image(image, tag):
-    res = requests.get(DOCKER_HUB_API_URL['token'].format(image=image), timeout=10).json()
-    token = res['token']
-    # ---
-    res = requests.get(
-        DOCKER_HUB_API_URL['digest'].format(image=image, tag=tag),
-        headers={
-            "Accept": "application/vnd.docker.distribution.manifest.v2+json",
-            "Authorization": "Bearer {0}".format(token)
-        },
-        timeout=10
-    ).text
-    digest = json.loads(res)['config']['digest']
-    # ---
-    res = requests.get(
-        DOCKER_HUB_API_URL['inspect'].format(image=image, tag=tag, digest=digest),
-        headers={
-            "Authorization": "Bearer {0}".format(token)
-        },
-        timeout=10
-    ).json()
-    return res
+    # tokens and HTTP connections are reused across calls
+    return Registry.inspect(image, tag)
 
 
 def parse_time(time_iso):
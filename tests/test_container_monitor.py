@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+# the jobs need the Duckietown libraries
+pytest.importorskip('dt_class_utils')
+pytest.importorskip('dt_module_utils')
+
+from code_api.knowledge_base import KnowledgeBase
+from code_api.jobs import container_monitor
+from code_api.jobs.container_monitor import ContainerMonitorJob
+
+ID = 'a' * 64
+
+
+class FakeAPI(object):
+    """Answers the listing with `containers`, and records what readers saw in the meantime."""
+
+    def __init__(self, monitor: ContainerMonitorJob, containers: list, error: Exception = None):
+        self._monitor = monitor
+        self._containers = containers
+        self._error = error
+        self.seen = []
+
+    def containers(self, all=False, filters=None):
+        self.seen.append(self._monitor.get('duckiebot-interface'))
+        if self._error is not None:
+            raise self._error
+        return [c for c in self._containers if c['Id'] == filters['id']]
+
+
+def _container(name: str, state: str) -> dict:
+    return {'Id': ID, 'Names': [f'/{name}'], 'Image': 'duckietown/dt-duckiebot-interface',
+            'State': state, 'Labels': {}}
+
+
+@pytest.fixture
+def monitor():
+    job = ContainerMonitorJob()
+    for name, _ in KnowledgeBase.get('containers'):
+        KnowledgeBase.remove('containers', name)
+    KnowledgeBase.set('containers', 'duckiebot-interface',
+                      job._record(_container('duckiebot-interface', 'running')))
+    return job
+
+
+def _event(monitor, monkeypatch, action: str, containers: list, error: Exception = None):
+    api = FakeAPI(monitor, containers, error)
+    monkeypatch.setattr(container_monitor, 'get_client', lambda: SimpleNamespace(api=api))
+    monitor._on_container_event({'id': ID, 'Action': action})
+    return api
+
+
+def test_record_stays_visible_while_refreshing(monitor, monkeypatch):
+    api = _event(monitor, monkeypatch, 'stop', [_container('duckiebot-interface', 'exited')])
+    assert api.seen[0]['status'] == 'running'
+    assert monitor.get('duckiebot-interface')['status'] == 'exited'
+
+
+def test_record_survives_a_failed_refresh(monitor, monkeypatch):
+    with pytest.raises(RuntimeError):
+        _event(monitor, monkeypatch, 'restart', [], error=RuntimeError('engine went away'))
+    assert monitor.get('duckiebot-interface')['status'] == 'running'
+
+
+def test_rename_and_destroy(monitor, monkeypatch):
+    _event(monitor, monkeypatch, 'rename', [_container('duckiebot-interface-old', 'running')])
+    assert monitor.get('duckiebot-interface') is None
+    assert monitor.get('duckiebot-interface-old')['status'] == 'running'
+    _event(monitor, monkeypatch, 'destroy', [])
+    assert monitor.list() == []
@@ -0,0 +1,99 @@
+import time
+import queue
+import threading
+
+from code_api.log_hub import LogHubs
+
+
+class FakeLogStream(object):
+    """A `follow` log stream: replays the last `tail` lines, then live lines until closed."""
+
+    def __init__(self, history, tail, live):
+        self._replay = history[-tail:] if tail > 0 else []
+        self._live = live
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        # the engine takes a while to answer, and sends chunks that do not match lines
+        time.sleep(0.05)
+        replay = b''.join(line + b'\n' for line in self._replay)
+        for i in range(0, len(replay), 7):
+            yield replay[i:i + 7]
+        while not self.closed.is_set():
+            try:
+                yield self._live.get(timeout=0.05)
+            except queue.Empty:
+                continue
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeContainer(object):
+
+    def __init__(self, history_lines: int):
+        self.id = f'fake-{history_lines}'
+        self.history = [f'history {i}'.encode() for i in range(history_lines)]
+        self.live = queue.Queue()
+        self.streams = []
+
+    def logs(self, stream=False, follow=False, tail='all', **_):
+        tail = len(self.history) if tail == 'all' else tail
+        if not stream:
+            return b''.join(line + b'\n' for line in self.history[-tail:] if tail > 0)
+        self.streams.append(FakeLogStream(self.history, tail, self.live))
+        return self.streams[-1]
+
+
+def _read(subscription, count: int):
+    lines = []
+    for line in subscription.lines(heartbeat_sec=2):
+        assert line is not None, f'timed out after {len(lines)} lines'
+        lines.append(line)
+        if len(lines) == count:
+            return lines
+
+
+def test_tail_then_live_lines():
+    container = FakeContainer(history_lines=1500)
+    subscription = LogHubs.subscribe(container, 10)
+    try:
+        for i in range(3):
+            container.live.put(f'live {i}\n'.encode())
+        lines = _read(subscription, 13)
+        assert lines == container.history[-10:] + [b'live 0', b'live 1', b'live 2']
+        assert subscription.dropped == 0
+    finally:
+        subscription.close()
+    assert container.streams[0].closed.is_set()
+
+
+def test_late_subscriber_gets_its_own_tail():
+    container = FakeContainer(history_lines=50)
+    first = LogHubs.subscribe(container, 5)
+    try:
+        assert _read(first, 5) == container.history[-5:]
+        container.live.put(b'live 0\n')
+        assert _read(first, 1) == [b'live 0']
+        # joins a running hub, gets its tail from the ring
+        second = LogHubs.subscribe(container, 3)
+        try:
+            container.live.put(b'live 1\n')
+            assert _read(second, 4) == container.history[-2:] + [b'live 0', b'live 1']
+            assert _read(first, 1) == [b'live 1']
+            # a single engine stream for both
+            assert len(container.streams) == 1
+        finally:
+            second.close()
+    finally:
+        first.close()
+
+
+def test_short_history():
+    container = FakeContainer(history_lines=0)
+    subscription = LogHubs.subscribe(container, 10)
+    try:
+        container.live.put(b'live 0\n')
+        assert _read(subscription, 1) == [b'live 0']
+    finally:
+        subscription.close()
@@ -0,0 +1,68 @@
+import pytest
+
+# the jobs need the Duckietown libraries
+pytest.importorskip('dt_class_utils')
+pytest.importorskip('dt_module_utils')
+
+from code_api.jobs import pull_queue
+from code_api.jobs.pull_queue import ImagePullQueue
+from code_api.jobs.update_module import UpdateModuleJob
+
+BASE = {'sha256:base-1': 30_000_000, 'sha256:base-2': 20_000_000}
+
+
+class FakeModule(object):
+    """A module whose remote image is `layers`, and whose installed image is `installed`."""
+
+    def __init__(self, name, layers, installed):
+        self.name = name
+        self.tag = f'duckietown/{name}:daffy'
+        self._layers = layers
+        self._installed = installed
+
+    def remote_layers(self):
+        return dict(self._layers)
+
+    def local_layers(self):
+        return set(self._installed)
+
+
+class FakeScheduler(object):
+    """Keeps the admitted tickets instead of running them."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(fn)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    fake = FakeScheduler()
+    monkeypatch.setattr(pull_queue, 'Scheduler', fake)
+    return fake
+
+
+def _layers(name, own, installed=BASE):
+    return UpdateModuleJob(FakeModule(name, {**BASE, own: 1_000_000}, installed)).layers()
+
+
+def test_shared_base_on_disk_does_not_serialize(scheduler):
+    queue = ImagePullQueue(concurrency=2)
+    queue.enqueue('dt-core', _layers('dt-core', 'sha256:core'), lambda t: None)
+    queue.enqueue('dt-gui-tools', _layers('dt-gui-tools', 'sha256:gui'), lambda t: None)
+    assert queue.stats() == {'active': ['dt-core', 'dt-gui-tools'], 'waiting': []}
+    assert len(scheduler.submitted) == 2
+
+
+def test_shared_base_to_download_serializes(scheduler):
+    queue = ImagePullQueue(concurrency=2)
+    queue.enqueue('dt-core', _layers('dt-core', 'sha256:core', installed=()), lambda t: None)
+    ticket = queue.enqueue('dt-gui-tools', _layers('dt-gui-tools', 'sha256:gui', installed=()),
+                           lambda t: None)
+    assert queue.stats() == {'active': ['dt-core'], 'waiting': ['dt-gui-tools']}
+    # the second pull starts as soon as the first one is done
+    scheduler.submitted[0].__self__.release()
+    assert queue.position(ticket) == 0
+    assert queue.stats() == {'active': ['dt-gui-tools'], 'waiting': []}
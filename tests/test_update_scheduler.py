@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+# the jobs need the Duckietown libraries
+pytest.importorskip('dt_class_utils')
+pytest.importorskip('dt_module_utils')
+
+from code_api.registry import Registry
+from code_api.jobs.update_scheduler import UpdateCheckScheduler
+
+
+@pytest.fixture
+def rate_limit(monkeypatch):
+    def _set(remaining: int, age: float, window: int = 21600):
+        monkeypatch.setattr(Registry, '_rate_limit', {
+            'updated': time.time() - age, 'limit': 100, 'remaining': remaining,
+            'window_sec': window
+        })
+    return _set
+
+
+def test_budget_exhausted(rate_limit):
+    rate_limit(0, age=60)
+    assert not UpdateCheckScheduler().has_budget()
+
+
+def test_budget_reading_expires_with_its_window(rate_limit):
+    rate_limit(0, age=7 * 3600, window=6 * 3600)
+    assert UpdateCheckScheduler().has_budget()
+
+
+def test_backoff_steps_once_per_reading(rate_limit):
+    scheduler = UpdateCheckScheduler(min_budget=20, max_backoff=8)
+    rate_limit(5, age=1)
+    for _ in range(3):
+        scheduler.has_budget()
+    assert scheduler.backoff == 2
+    # a new reading, still low
+    rate_limit(4, age=0)
+    scheduler.has_budget()
+    assert scheduler.backoff == 4